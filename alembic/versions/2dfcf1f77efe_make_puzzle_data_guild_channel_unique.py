@@ -0,0 +1,48 @@
+"""Make puzzle_data (guild_id, channel_id) unique
+
+Revision ID: 2dfcf1f77efe
+Revises: b9e94ee53985
+Create Date: 2026-10-17 19:48:13.602957
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2dfcf1f77efe'
+down_revision = 'b9e94ee53985'
+branch_labels = None
+depends_on = None
+
+# Of each set of duplicate rows, keep the active one (if any), else the oldest
+DUPLICATES = """
+    SELECT id, first_value(id) OVER (
+        PARTITION BY guild_id, channel_id
+        ORDER BY delete_time IS NOT NULL, id
+    ) AS keep_id
+    FROM puzzle_data
+"""
+
+
+def upgrade():
+    # Move notes of duplicate rows to the row which is kept, then drop the duplicates
+    op.execute(
+        f"UPDATE puzzle_notes SET puzzle_id = duplicates.keep_id FROM ({DUPLICATES}) AS duplicates "
+        "WHERE puzzle_notes.puzzle_id = duplicates.id AND duplicates.id <> duplicates.keep_id"
+    )
+    op.execute(
+        f"DELETE FROM puzzle_data USING ({DUPLICATES}) AS duplicates "
+        "WHERE puzzle_data.id = duplicates.id AND duplicates.id <> duplicates.keep_id"
+    )
+    # The unique constraint's index replaces the plain index
+    op.drop_index('ix_puzzle_data_guild_id_channel_id', table_name='puzzle_data')
+    op.create_unique_constraint(
+        'uq_puzzle_data_guild_id_channel_id', 'puzzle_data', ['guild_id', 'channel_id']
+    )
+
+
+def downgrade():
+    op.drop_constraint('uq_puzzle_data_guild_id_channel_id', 'puzzle_data', type_='unique')
+    op.create_index(
+        'ix_puzzle_data_guild_id_channel_id', 'puzzle_data', ['guild_id', 'channel_id'], unique=False
+    )
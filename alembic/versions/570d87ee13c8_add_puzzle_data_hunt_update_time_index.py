@@ -0,0 +1,25 @@
+"""Add an index on puzzle_data hunt_id and update_time
+
+Revision ID: 570d87ee13c8
+Revises: 2dfcf1f77efe
+Create Date: 2026-10-17 21:06:18.204513
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '570d87ee13c8'
+down_revision = '2dfcf1f77efe'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_puzzle_data_hunt_id_update_time', 'puzzle_data', ['hunt_id', 'update_time'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_puzzle_data_hunt_id_update_time', table_name='puzzle_data')
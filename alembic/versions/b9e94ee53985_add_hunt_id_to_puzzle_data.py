@@ -0,0 +1,51 @@
+"""Add hunt_id to puzzle_data
+
+Revision ID: b9e94ee53985
+Revises: 70b2959158ba
+Create Date: 2026-10-17 19:02:41.530218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e94ee53985'
+down_revision = '70b2959158ba'
+branch_labels = None
+depends_on = None
+
+# Rows backfilled per UPDATE; each batch is committed on its own, so that
+# rows are not locked and WAL is not held for the whole backfill
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade():
+    op.add_column('puzzle_data', sa.Column('hunt_id', sa.BIGINT(), nullable=True))
+
+    connection = op.get_bind()
+    backfill = sa.text(
+        "UPDATE puzzle_data SET hunt_id = round_data.hunt_id FROM round_data "
+        "WHERE puzzle_data.round_id = round_data.category_id AND puzzle_data.id IN ("
+        "  SELECT puzzle_data.id FROM puzzle_data"
+        "  JOIN round_data ON puzzle_data.round_id = round_data.category_id"
+        "  WHERE puzzle_data.hunt_id IS NULL AND round_data.hunt_id IS NOT NULL"
+        "  LIMIT :batch_size"
+        ")"
+    )
+    # Commits the add_column first, then runs each UPDATE in its own transaction
+    with op.get_context().autocommit_block():
+        while connection.execute(backfill, batch_size=BACKFILL_BATCH_SIZE).rowcount:
+            pass
+
+    op.create_index(
+        'ix_puzzle_data_guild_id_hunt_id_delete_time',
+        'puzzle_data',
+        ['guild_id', 'hunt_id', 'delete_time'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_puzzle_data_guild_id_hunt_id_delete_time', table_name='puzzle_data')
+    op.drop_column('puzzle_data', 'hunt_id')
@@ -0,0 +1,43 @@
+"""Add partial indexes for puzzles to archive and delete
+
+Revision ID: bedb9572af7b
+Revises: 904b74b7ea8a
+Create Date: 2026-10-17 11:03:27.904615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bedb9572af7b'
+down_revision = '904b74b7ea8a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_puzzle_data_to_archive',
+        'puzzle_data',
+        ['guild_id', 'solve_time'],
+        unique=False,
+        postgresql_where=sa.text(
+            "status = 'solved' AND archive_time IS NULL AND delete_time IS NULL"
+        ),
+    )
+    op.create_index(
+        'ix_puzzle_data_to_delete',
+        'puzzle_data',
+        ['guild_id', 'delete_request'],
+        unique=False,
+        postgresql_where=sa.text(
+            "delete_request IS NOT NULL AND solve_time IS NULL "
+            "AND archive_time IS NULL AND delete_time IS NULL"
+        ),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_puzzle_data_to_delete', table_name='puzzle_data')
+    op.drop_index('ix_puzzle_data_to_archive', table_name='puzzle_data')
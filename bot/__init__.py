@@ -6,6 +6,7 @@ import discord
 from discord.ext import commands
 
 from bot import utils, database
+from bot.data.job_queue import JobQueue
 from bot.database.models import GuildSettings
 
 __version__ = "0.1.0"
@@ -31,10 +32,12 @@ intents = discord.Intents(messages=True, message_content=True, guilds=True)
 bot = commands.AutoShardedBot(command_prefix=get_prefix, intents=intents)
 bot.version = __version__
 bot.guild_data = {}
+bot.job_queue = JobQueue(workers=utils.config.job_workers)
 
 
 async def preload_guild_data():
     guilds = await GuildSettings.query.gino.all()
+    GuildSettings.prime_cache(guilds)
     d = dict()
     for guild in guilds:
         d[guild.id] = {"prefix": guild.prefix}
@@ -57,6 +60,7 @@ async def on_ready():
     )
 
     # Start up any loops which run against the database
+    bot.job_queue.start()
     for key in bot.cogs:
         try:
             bot.cogs[key].begin_loops()
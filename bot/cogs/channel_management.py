@@ -3,17 +3,37 @@ from __future__ import annotations
 import asyncio
 import datetime
 import logging
-from typing import List, Optional
+from pathlib import Path
+import time
+from typing import List, Literal, Optional, Set
 
+import aiohttp
 import discord
 from discord import app_commands
-from discord.ext import commands, tasks
+from discord.ext import commands
 import pytz
 
 from bot.base_cog import BaseCog, GeneralAppError
-from bot.data.puzzle_db import PuzzleDb
-from bot import database
-from bot.database.models import PuzzleData, RoundData, HuntSettings
+from bot.data.archive_scheduler import ArchiveScheduler
+from bot.data.puzzle_db import MissingPuzzleError, PuzzleDb
+from bot import database, utils
+from bot.database.models import ArchiveLedger, JobData, PuzzleData, RoundData, HuntSettings
+from bot.database.upsert import get_or_insert
+from bot.utils.archive import (
+    ARCHIVE_START_MARKER,
+    ArchivePost,
+    ArchiveProgress,
+    ArchiveTarget,
+    MessagePacker,
+    message_header,
+    parse_archive_start,
+)
+from bot.utils.archive_search import IndexedMessage, archive_index
+from bot.utils.attachment_relay import AttachmentRelay
+from bot.utils.channel_index import channel_index
+from bot.utils.export import EXPORT_DIR, ChannelExporter, compression
+from bot.utils.teardown import TeardownProgress, delete_channels
+from bot.utils.timing import StageTimer
 
 logger = logging.getLogger(__name__)
 
@@ -21,14 +41,164 @@ logger = logging.getLogger(__name__)
 class ChannelManagement(BaseCog):
     PUZZLE_REASON = "bot-puzzle"
     DELETE_REASON = "bot-delete"
+    ARCHIVE_WEBHOOK_NAME = "puzzle-archive"
     SOLVED_PUZZLES_CATEGORY_PREFIX = "SOLVED-"
 
+    # Kind of background job for /delete_all, see bot.data.job_queue
+    DELETE_CHANNELS_JOB = "delete_puzzle_channels"
+    # Channels deleted concurrently by a /delete_all teardown
+    DELETE_CONCURRENCY = 4
+
     def __init__(self, bot):
         self.bot = bot
+        self.archive_scheduler = ArchiveScheduler(self.process_due_puzzles)
+        # Background tasks started by begin_loops, referenced so they are not garbage collected
+        self.tasks: Set[asyncio.Task] = set()
+        bot.job_queue.register(self.DELETE_CHANNELS_JOB, self.run_delete_channels_job)
 
     def begin_loops(self):
         logger.info("Beginning loops")
-        self.archived_solved_puzzles_loop.start()
+        self.start_task(self.sync_deleted_channels())
+        if not self.archive_scheduler.is_running():
+            self.archive_scheduler.start()
+            self.start_task(self.rebuild_archive_schedule())
+
+    def start_task(self, coro):
+        """Run coro in the background, logging any exception"""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                f"Background task {task.get_coro().__qualname__} failed",
+                exc_info=task.exception(),
+            )
+
+    async def cog_unload(self):
+        self.archive_scheduler.stop()
+        for task in list(self.tasks):
+            task.cancel()
+        self.bot.job_queue.unregister(self.DELETE_CHANNELS_JOB)
+        await archive_index.close()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        channel_index.add(channel)
+        self.check_channel_index(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ):
+        channel_index.add(after)
+        self.check_channel_index(after.guild)
+        try:
+            await self.sync_updated_channel(before, after)
+        except Exception:
+            logger.exception(f"Unable to update backend for channel {after.id} {after.name}")
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        channel_index.remove(channel)
+        self.check_channel_index(channel.guild)
+        try:
+            await self.sync_deleted_channel(channel)
+        except Exception:
+            logger.exception(f"Unable to update backend for deleted channel {channel.id}")
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        channel_index.forget_guild(guild.id)
+
+    async def sync_updated_channel(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ):
+        """Follow renames and moves of puzzle channels and rounds in the backend"""
+        guild_id = after.guild.id
+        if after.type == discord.ChannelType.category:
+            if before.name != after.name:
+                await RoundData.update.values(name=after.name).where(
+                    RoundData.category_id == after.id
+                ).gino.status()
+                puzzles = await PuzzleDb.update_where(
+                    (PuzzleData.guild_id == guild_id) & (PuzzleData.round_id == after.id),
+                    round_name=after.name,
+                )
+                if puzzles:
+                    logger.info(f"Renamed round {before.name} to {after.name}")
+            return
+        if after.type != discord.ChannelType.text:
+            return
+
+        updates = {}
+        if before.name != after.name:
+            updates["name"] = after.name
+        if before.category_id != after.category_id and after.category_id:
+            # Only follow moves into another round, and not e.g. into a solved category
+            round_data = await RoundData.query.where(
+                RoundData.category_id == after.category_id
+            ).gino.first()
+            if round_data is not None:
+                updates.update(
+                    round_id=round_data.category_id,
+                    round_name=round_data.name,
+                    hunt_id=round_data.hunt_id,
+                )
+        if updates:
+            puzzles = await PuzzleDb.update_where(
+                (PuzzleData.guild_id == guild_id) & (PuzzleData.channel_id == after.id), **updates
+            )
+            if puzzles:
+                logger.info(f"Updated puzzle for channel {after.id}: {updates}")
+
+    async def sync_deleted_channel(self, channel: discord.abc.GuildChannel):
+        """Mark puzzles, voice channels and solved categories deleted in the backend"""
+        guild_id = channel.guild.id
+        if channel.type == discord.ChannelType.text:
+            if await PuzzleDb.delete_channel(guild_id, channel.id):
+                logger.info(f"Marked puzzle for deleted channel {channel.id} {channel.name} as deleted")
+        elif channel.type == discord.ChannelType.voice:
+            await PuzzleDb.update_where(
+                (PuzzleData.guild_id == guild_id) & (PuzzleData.voice_channel_id == channel.id),
+                voice_channel_id=0,
+            )
+        elif channel.type == discord.ChannelType.category:
+            # A new solved category is created on demand by get_or_create_solved_category.
+            # Deleted round categories are left alone: their rows anchor the round's
+            # puzzles, whose channels Discord moves out of the category.
+            await RoundData.update.values(solved_category_id=0).where(
+                RoundData.solved_category_id == channel.id
+            ).gino.status()
+            await PuzzleDb.update_where(
+                (PuzzleData.guild_id == guild_id) & (PuzzleData.solved_round_id == channel.id),
+                solved_round_id=0,
+            )
+
+    async def sync_deleted_channels(self):
+        """Mark puzzles whose channels were deleted while the bot was offline as deleted"""
+        for guild in self.bot.guilds:
+            try:
+                missing_channel_ids = await PuzzleDb.delete_missing(
+                    guild.id, [channel.id for channel in guild.channels]
+                )
+            except Exception:
+                logger.exception(f"Unable to sync deleted channels for guild {guild.id} {guild.name}")
+                continue
+            if missing_channel_ids:
+                logger.info(
+                    f"Marked {len(missing_channel_ids)} puzzles in guild {guild.id} as deleted, "
+                    f"whose channels were deleted while offline: {missing_channel_ids}"
+                )
+
+    def check_channel_index(self, guild: discord.Guild):
+        """In debug mode, compare the channel index to discord.py's channel cache"""
+        if not utils.config.debug:
+            return
+        for error in channel_index.check(guild):
+            logger.warning(f"Channel index of guild {guild.id}: {error}")
 
     def clean_name(self, name):
         """Cleanup name to be appropriate for discord channel"""
@@ -116,7 +286,7 @@ class ChannelManagement(BaseCog):
             return
 
         guild = interaction.guild
-        category = discord.utils.get(guild.categories, name=category_name)
+        category = channel_index.find_category(guild, category_name)
         if category:
             logger.info(f"Round channel already exists: {category.name} {category.id}")
         else:
@@ -126,6 +296,7 @@ class ChannelManagement(BaseCog):
             if new_position < 1:
                 new_position = len(guild.categories)
             category = await guild.create_category(category_name, position=new_position)
+            channel_index.add(category)
             from_category = 0
             if interaction.channel.category:
                 from_category = interaction.channel.category.id
@@ -173,9 +344,7 @@ class ChannelManagement(BaseCog):
             channel_type is discord.ChannelType.text or channel_type is discord.ChannelType.voice
         ):
             raise ValueError(f"Unrecognized channel_type: {channel_type}")
-        channel = discord.utils.get(
-            guild.channels, category=category, type=channel_type, name=channel_name
-        )
+        channel = channel_index.find(guild, channel_type, channel_name, category=category)
         created = False
         if not channel:
             message = f"Creating a new channel: {channel_name} of type {channel_type} for category: {category}"
@@ -187,10 +356,19 @@ class ChannelManagement(BaseCog):
                 else guild.create_voice_channel
             )
             channel = await create_method(channel_name, category=category, **kwargs)
+            channel_index.add(channel)
             created = True
 
         return (channel, created)
 
+    async def delete_created_channels(self, channels: list):
+        """Delete channels created for a puzzle which could not be created, logging failures"""
+        for channel in channels:
+            try:
+                await channel.delete(reason=self.DELETE_REASON)
+            except discord.HTTPException:
+                logger.exception(f"Unable to delete #{channel.name} of a failed puzzle creation")
+
     async def create_puzzle_channel(
         self,
         interaction,
@@ -207,11 +385,11 @@ class ChannelManagement(BaseCog):
         guild = interaction.guild
         category_name = round_name
         if category_id > 0:
-            category = discord.utils.get(guild.categories, id=category_id)
+            category = channel_index.get_category(guild, category_id)
         else:
             # searching by category name is not safe across multiple hunts
             # in case of round name collisions
-            category = discord.utils.get(guild.categories, name=category_name)
+            category = channel_index.find_category(guild, category_name)
         if category is None:
             await interaction.response.send_message(
                 f"Round {category_name} id:{category_id} not found, unable to create puzzle channel. "
@@ -223,28 +401,74 @@ class ChannelManagement(BaseCog):
             f"Creating channel(s) for puzzle {puzzle_name}", ephemeral=True
         )
         channel_name = self.clean_name(puzzle_name)
-        text_channel, created_text = await self.get_or_create_channel(
-            guild=guild,
-            category=category,
-            channel_name=channel_name,
-            channel_type="text",
-            reason=self.PUZZLE_REASON,
-        )
+        timer = StageTimer()
         guild_settings = await database.query_guild(guild.id)
-        round_settings = await RoundData.query_by_category(category.id)
+
+        async def query_round_and_hunt():
+            round_settings = await RoundData.query_by_category(category.id)
+            if not round_settings:
+                return (None, None)
+            hunt_settings = await database.query_hunt_settings_by_round(guild.id, category.id)
+            return (round_settings, hunt_settings)
+
+        # Channels and settings do not depend on each other, so look them up concurrently
+        stages = [
+            timer.run("settings", query_round_and_hunt()),
+            timer.run(
+                "text_channel",
+                self.get_or_create_channel(
+                    guild=guild,
+                    category=category,
+                    channel_name=channel_name,
+                    channel_type="text",
+                    reason=self.PUZZLE_REASON,
+                ),
+            ),
+        ]
+        if guild_settings.discord_use_voice_channels:
+            stages.append(
+                timer.run(
+                    "voice_channel",
+                    self.get_or_create_channel(
+                        guild=guild,
+                        category=category,
+                        channel_name=channel_name,
+                        channel_type="voice",
+                        reason=self.PUZZLE_REASON,
+                    ),
+                )
+            )
+        results = await asyncio.gather(*stages, return_exceptions=True)
+        # Channels created by this command, to delete again if the puzzle cannot be created
+        created_channels = [
+            result[0]
+            for result in results[1:]
+            if not isinstance(result, BaseException) and result[1]
+        ]
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            logger.error(
+                f"Unable to create puzzle {category_name}/{channel_name}: {timer.summary()}"
+            )
+            await self.delete_created_channels(created_channels)
+            raise errors[0]
+        (round_settings, hunt_settings), (text_channel, created_text) = results[:2]
+        voice_channel, created_voice = results[2] if len(results) > 2 else (None, False)
+
+        error_message = None
         if not round_settings:
-            await interaction.followup.send(
+            error_message = (
                 f"Round {category_name} id:{category_id} not found in database, unable to create puzzle channel. "
                 f"May need to first create /round {category_name}"
             )
-            return
-
-        hunt_settings = await database.query_hunt_settings_by_round(guild.id, category.id)
-        if hunt_settings.end_time is not None:
-            await interaction.followup.send(
+        elif hunt_settings.end_time is not None:
+            error_message = (
                 f"Round {category_name} belongs to hunt {hunt_settings.hunt_name} "
                 f"which already ended on {hunt_settings.end_time}"
             )
+        if error_message:
+            await self.delete_created_channels(created_channels)
+            await interaction.followup.send(error_message)
             return
 
         if created_text:
@@ -270,49 +494,58 @@ class ChannelManagement(BaseCog):
                 else:
                     url_name = channel_name.lower().replace("-", url_sep)
                     url = f"{url_base}/{url_name}"
-            puzzle_data = await database.query_puzzle_data(
-                guild_id=interaction.guild.id,
-                channel_id=text_channel.id,
-                round_id=category.id,
+            is_discussion = (
+                channel_name == guild_settings.discussion_channel and channel_name != "meta"
             )
-            await puzzle_data.update(
+            updates = dict(
                 name=channel_name,
                 round_name=category_name,
                 round_id=category.id,
+                hunt_id=round_settings.hunt_id,
                 guild_name=guild.name,
                 channel_mention=text_channel.mention,
                 hunt_url=url,
                 start_time=datetime.datetime.now(tz=pytz.UTC),
-            ).apply()
-            await text_channel.send(
-                embed=self.build_channel_info_message(
-                    guild_settings.discussion_channel, text_channel
-                )
             )
+            if voice_channel is not None:
+                updates["voice_channel_id"] = voice_channel.id
+            if is_discussion:
+                updates["puzzle_type"] = "discussion"
+
+            async def save_puzzle_data():
+                puzzle_data = await database.query_puzzle_data(
+                    guild_id=interaction.guild.id,
+                    channel_id=text_channel.id,
+                    round_id=category.id,
+                )
+                await puzzle_data.update(**updates).apply()
+                return puzzle_data
 
-            if channel_name == guild_settings.discussion_channel and channel_name != "meta":
-                await puzzle_data.update(puzzle_type="discussion").apply()
-            else:
+            puzzle_data = await timer.run("database", save_puzzle_data())
+            PuzzleDb.cache(puzzle_data)
+
+            await timer.run(
+                "intro_message",
+                text_channel.send(
+                    embed=self.build_channel_info_message(
+                        guild_settings.discussion_channel, text_channel
+                    )
+                ),
+            )
+            if not is_discussion:
                 gsheet_cog = self.bot.get_cog("GoogleSheets")
                 if gsheet_cog is not None:
-                    # update google sheet ID
-                    await gsheet_cog.create_puzzle_spreadsheet(text_channel, puzzle_data)
+                    # The sheet link is posted to the channel once created in the background
+                    await timer.run(
+                        "spreadsheet", gsheet_cog.enqueue_puzzle_spreadsheet(puzzle_data)
+                    )
         else:
             puzzle_data = await self.get_puzzle_data_from_channel(text_channel)
-
-        created_voice = False
-        voice_channel = None
-        if guild_settings.discord_use_voice_channels:
-            voice_channel, created_voice = await self.get_or_create_channel(
-                guild=guild,
-                category=category,
-                channel_name=channel_name,
-                channel_type="voice",
-                reason=self.PUZZLE_REASON,
-            )
-            if created_voice:
+            if created_voice and puzzle_data:
                 await puzzle_data.update(voice_channel_id=voice_channel.id).apply()
 
+        logger.info(f"Created puzzle {category_name}/{channel_name}: {timer.summary()}")
+
         created = created_text or created_voice
         if created:
             if created_text and created_voice:
@@ -401,6 +634,7 @@ class ChannelManagement(BaseCog):
 
         await PuzzleDb.request_delete(puzzle_data)
         logger.info(f"Scheduling deletion for puzzle: {puzzle_data.name}")
+        self.archive_scheduler.schedule_in(interaction.guild.id, PuzzleDb.DELETE_DELAY)
 
         settings = await database.query_guild(interaction.guild.id)
         emoji = settings.discord_bot_emoji or ""
@@ -419,16 +653,17 @@ class ChannelManagement(BaseCog):
     @app_commands.command()
     async def cleanup_deleted_channels(self, interaction: discord.Interaction):
         """*(admin) Mark manually deleted channels as deleted in the backend*"""
-        all_puzzles = await PuzzleDb.get_all(interaction.guild.id)
-        count = 0
-        for puzzle in all_puzzles:
-            if puzzle.delete_time is None:
-                if self.bot.get_channel(puzzle.channel_id) is None:
-                    count = count + 1
-                    logger.info(f"Marking channel {puzzle.round_name}/{puzzle.name} as deleted")
-                    await PuzzleDb.delete(puzzle)
+        start = time.monotonic()
+        channel_ids = [channel.id for channel in interaction.guild.channels]
+        missing_channel_ids = await PuzzleDb.delete_missing(interaction.guild.id, channel_ids)
+        elapsed = time.monotonic() - start
+        logger.info(
+            f"Marked {len(missing_channel_ids)} missing channels in guild {interaction.guild.id} "
+            f"as deleted in {elapsed:.3f}s: {missing_channel_ids}"
+        )
         embed = discord.Embed(
-            description=f"Swept through channels, marked {count} missing channels as deleted in the backend."
+            description=f"Swept through channels, marked {len(missing_channel_ids)} missing channels "
+            f"as deleted in the backend ({len(channel_ids)} channels in the server, {elapsed:.2f}s)."
         )
         await interaction.response.send_message(embed=embed)
 
@@ -441,8 +676,9 @@ class ChannelManagement(BaseCog):
             return
 
         if puzzle_data.status == "deleting" or puzzle_data.delete_time is not None:
-            await puzzle_data.update(status="", delete_time=None).apply()
+            await puzzle_data.update(status="", delete_request=None, delete_time=None).apply()
             logger.info(f"Un-scheduling deletion for puzzle: {puzzle_data.name}")
+            await self.reschedule_guild(interaction.guild.id)
 
             settings = await database.query_guild(interaction.guild.id)
             emoji = settings.discord_bot_emoji or ""
@@ -470,13 +706,12 @@ class ChannelManagement(BaseCog):
             )
             logger.info(f"Deleting puzzle: {puzzle.name}")
 
-            text_channel = discord.utils.get(
-                guild.channels, type=discord.ChannelType.text, id=puzzle.channel_id
-            )
+            text_channel = channel_index.get(guild, puzzle.channel_id, discord.ChannelType.text)
             await self.delete_voice_channel(guild, puzzle, reason=delete_reason)
-            await PuzzleDb.delete(puzzle)
+            await PuzzleDb.delete_puzzles(guild.id, [puzzle.id])
             # delete text channel last so that errors can be reported
-            await text_channel.delete(reason=self.DELETE_REASON)
+            if text_channel is not None:
+                await text_channel.delete(reason=self.DELETE_REASON)
 
     @commands.has_permissions(manage_channels=True)
     @app_commands.command()
@@ -496,11 +731,8 @@ class ChannelManagement(BaseCog):
         category = channel.category
 
         # TODO: need to confirm deletion first!
-        voice_channel = discord.utils.get(
-            interaction.guild.channels,
-            category=category,
-            type=discord.ChannelType.voice,
-            name=channel.name,
+        voice_channel = channel_index.find(
+            interaction.guild, discord.ChannelType.voice, channel.name, category=category
         )
         if voice_channel:
             await voice_channel.delete(reason=self.DELETE_REASON)
@@ -511,31 +743,40 @@ class ChannelManagement(BaseCog):
     @commands.has_permissions(manage_channels=True)
     @app_commands.command()
     async def delete_all(
-        self, interaction: discord.Interaction, base_url: str, dry_run: bool = True
+        self,
+        interaction: discord.Interaction,
+        base_url: Optional[str] = None,
+        dry_run: bool = True,
+        hunt: Optional[str] = None,
     ):
         """*(admin) Permanently delete a channel*
 
-        The current syntax is `/delete_all {base_url:str} {dry_run:bool}`
-        and will delete all puzzle channels whose puzzle URL starts with `base_url`.
+        The current syntax is `/delete_all {base_url:str} {dry_run:bool} {hunt:str}`
+        and will delete all puzzle channels of the hunt, and/or whose puzzle URL
+        starts with `base_url`.
         """
-        # Ideally in the future we would use a stricter identifier for hunt
-        # instead of base_url. For now just a simple check that not inputting
-        # an empty string.
-        if not base_url or len(base_url) <= len("https://"):
-            logger.error("base_url required for delete_all")
+        # Require a hunt or a base_url, and not just an empty string.
+        if not hunt and (not base_url or len(base_url) <= len("https://")):
+            logger.error("hunt or base_url required for delete_all")
             await interaction.response.send_message(
-                ":exclamation: base_url required for delete_all"
+                ":exclamation: hunt or base_url required for delete_all"
             )
             return
 
-        puzzles = await PuzzleDb.get_all(interaction.guild.id)
-        # TODO: use a hunt identifier instead
-        puzzles_found = [
-            p for p in puzzles if p.hunt_url is not None and p.hunt_url.startswith(base_url)
-        ]
+        hunt_id = None
+        if hunt:
+            hunt_id = await HuntSettings.get_id_for_name(interaction.guild.id, hunt)
+            if hunt_id is None:
+                await interaction.response.send_message(f":exclamation: Hunt {hunt} not found")
+                return
+        puzzles_found = await PuzzleDb.get_all(interaction.guild.id, hunt_id=hunt_id)
+        if base_url:
+            puzzles_found = [
+                p for p in puzzles_found if p.hunt_url is not None and p.hunt_url.startswith(base_url)
+            ]
         if not puzzles_found:
             await interaction.response.send_message(
-                f":exclamation: No puzzles found for {base_url}"
+                f":exclamation: No puzzles found for {hunt or base_url}"
             )
             return
 
@@ -545,50 +786,109 @@ class ChannelManagement(BaseCog):
     async def confirm_delete_all(
         self, interaction, puzzles: List[PuzzleData], dry_run: bool = False
     ):
-        """Actually delete puzzles and channels"""
-        for puzzle in puzzles:
-            try:
-                reason = "delete all puzzles from hunt"
+        """Plan the deletion of the puzzles' channels, and run it as a background job
 
-                # delete text channel last so that errors can be reported
-                text_channel = discord.utils.get(
-                    interaction.guild.channels, type=discord.ChannelType.text, id=puzzle.channel_id
+        The puzzles are marked deleted with a single UPDATE, and the channels deleted
+        by run_delete_channels_job, which reports progress by editing a status message.
+        """
+        guild = interaction.guild
+        channel_ids = []
+        for puzzle in puzzles:
+            voice_channel = self.find_voice_channel(guild, puzzle)
+            if voice_channel is not None:
+                channel_ids.append(voice_channel.id)
+        for puzzle in puzzles:
+            text_channel = channel_index.get(guild, puzzle.channel_id, discord.ChannelType.text)
+            if dry_run:
+                logger.info(
+                    f"Deleting puzzle {puzzle.round_name}:{puzzle.name} {puzzle.channel_id}, found text_channel: {text_channel}"
                 )
-                if dry_run:
-                    logger.info(
-                        f"Deleting puzzle {puzzle.round_name}:{puzzle.name} {puzzle.channel_id}, found text_channel: {text_channel}"
-                    )
-                else:
-                    await self.delete_voice_channel(interaction.guild, puzzle, reason=reason)
-
-                    if text_channel:
-                        try:
-                            await text_channel.delete(reason=reason)
-                        except discord.errors.NotFound:
-                            logger.exception(
-                                f"Unable to delete text_channel {text_channel} for puzzle {puzzle.name}"
-                            )
-                    # Make sure the database entry is flagged as deleted.
-                    await PuzzleDb.delete(puzzle)
-            except Exception:
-                logger.exception(f"Unable to delete puzzle: {puzzle.name}")
+            if text_channel is not None:
+                channel_ids.append(text_channel.id)
+
+        if dry_run:
+            await interaction.response.send_message(
+                f"Dry run: would delete {len(puzzles)} puzzles and {len(channel_ids)} channels"
+            )
+            return
 
-        await interaction.response.send_message(f"Deleted {len(puzzles)} puzzle channels")
+        await interaction.response.send_message(
+            f"Deleting {len(puzzles)} puzzles and {len(channel_ids)} channels in the background",
+            ephemeral=True,
+        )
+        status_message = await interaction.channel.send(
+            f"Deleting {len(channel_ids)} puzzle channels..."
+        )
+        await self.bot.job_queue.enqueue(
+            guild.id,
+            self.DELETE_CHANNELS_JOB,
+            {
+                "puzzle_ids": [puzzle.id for puzzle in puzzles],
+                "channel_ids": channel_ids,
+                "status_channel_id": status_message.channel.id,
+                "status_message_id": status_message.id,
+            },
+        )
 
-    async def delete_voice_channel(
-        self, guild: discord.Guild, puzzle: PuzzleData, reason: Optional[str] = None
-    ):
-        """If found, delete associated voice channel"""
-        voice_channel: Optional[discord.VoiceChannel] = None
+    async def run_delete_channels_job(self, job: JobData):
+        """Delete the channels planned by confirm_delete_all
+
+        Channels which are already gone, e.g. deleted before a restart, are skipped,
+        so the job can be retried or resumed.
+        """
+        guild = self.bot.get_guild(job.guild_id)
+        if guild is None:
+            logger.info(f"Guild for job {job.id} no longer exists, not deleting channels")
+            return
+        payload = job.payload
+        await PuzzleDb.delete_puzzles(guild.id, payload["puzzle_ids"])
+
+        status_message = None
+        status_channel = self.bot.get_channel(payload["status_channel_id"])
+        if status_channel is not None:
+            status_message = status_channel.get_partial_message(payload["status_message_id"])
+
+        async def report(progress: TeardownProgress):
+            if status_message is None:
+                return
+            try:
+                await status_message.edit(content=progress.text())
+            except discord.HTTPException:
+                # e.g. the status message was in one of the deleted channels
+                logger.info(f"Unable to update status message for job {job.id}")
+
+        channels = [channel_index.get(guild, channel_id) for channel_id in payload["channel_ids"]]
+        progress = TeardownProgress(len(channels))
+        failed = await delete_channels(
+            channels,
+            progress,
+            self.DELETE_CONCURRENCY,
+            reason="delete all puzzles from hunt",
+            on_progress=report,
+        )
+        logger.info(f"Job {job.id}: {progress.text()}")
+        await report(progress)
+        if failed:
+            names = ", ".join(channel.name for channel in failed)
+            raise RuntimeError(f"Unable to delete {len(failed)} channels: {names}")
+
+    def find_voice_channel(
+        self, guild: discord.Guild, puzzle: PuzzleData
+    ) -> Optional[discord.VoiceChannel]:
+        voice_channel = None
         if puzzle.voice_channel_id:
-            voice_channel = discord.utils.get(
-                guild.channels, type=discord.ChannelType.voice, id=puzzle.voice_channel_id
+            voice_channel = channel_index.get(
+                guild, puzzle.voice_channel_id, discord.ChannelType.voice
             )
         if not voice_channel:
-            voice_channel = discord.utils.get(
-                guild.channels, type=discord.ChannelType.voice, name=puzzle.name
-            )
+            voice_channel = channel_index.find(guild, discord.ChannelType.voice, puzzle.name)
+        return voice_channel
 
+    async def delete_voice_channel(
+        self, guild: discord.Guild, puzzle: PuzzleData, reason: Optional[str] = None
+    ):
+        """If found, delete associated voice channel"""
+        voice_channel = self.find_voice_channel(guild, puzzle)
         if voice_channel:
             try:
                 await voice_channel.delete(reason=reason)
@@ -602,15 +902,15 @@ class ChannelManagement(BaseCog):
     ) -> discord.CategoryChannel:
         solved_category = None
         if puzzle.solved_round_id:
-            solved_category = discord.utils.get(guild.categories, id=puzzle.solved_round_id)
+            solved_category = channel_index.get_category(guild, puzzle.solved_round_id)
 
         if not solved_category:
             solved_category_name = self.SOLVED_PUZZLES_CATEGORY_PREFIX + puzzle.round_name
-            solved_category = discord.utils.get(guild.categories, name=solved_category_name)
+            solved_category = channel_index.find_category(guild, solved_category_name)
 
         if not solved_category:
             position = len(guild.categories) - 1
-            open_category = discord.utils.get(guild.categories, id=puzzle.round_id)
+            open_category = channel_index.get_category(guild, puzzle.round_id)
             if open_category:
                 position = open_category.position
 
@@ -619,6 +919,7 @@ class ChannelManagement(BaseCog):
                 f" at position {position}"
             )
             solved_category = await guild.create_category(solved_category_name, position=position)
+            channel_index.add(solved_category)
 
         round_data = await database.query_round_data(guild.id, puzzle.round_id)
         await round_data.update(solved_category_id=solved_category.id).apply()
@@ -639,16 +940,14 @@ class ChannelManagement(BaseCog):
         for puzzle in puzzles_to_archive:
             solved_category = await self.get_or_create_solved_category(guild, puzzle)
 
-            channel = discord.utils.get(
-                guild.channels, type=discord.ChannelType.text, id=puzzle.channel_id
-            )
+            channel = channel_index.get(guild, puzzle.channel_id, discord.ChannelType.text)
             if channel:
                 await channel.edit(category=solved_category)
 
             await self.delete_voice_channel(guild, puzzle, reason="archiving solved puzzle")
 
             if gsheet_cog:
-                await gsheet_cog.archive_puzzle_spreadsheet(puzzle)
+                await gsheet_cog.enqueue_archive_spreadsheet(puzzle)
 
             channel_mention = None
             if channel:
@@ -658,13 +957,14 @@ class ChannelManagement(BaseCog):
                 archive_channel_mention=channel_mention,
                 solved_round_id=solved_category.id,
             ).apply()
+            PuzzleDb.cache(puzzle)
         return puzzles_to_archive
 
     @app_commands.command()
     async def archive_solved(self, interaction: discord.Interaction):
         """*(admin) Archive solved puzzles. Done automatically*
 
-        Done automatically on task loop, so this is only useful for debugging
+        Done automatically by the archive scheduler, so this is only useful for debugging
         """
         if not (await self.check_is_bot_channel(interaction)):
             return
@@ -674,137 +974,514 @@ class ChannelManagement(BaseCog):
         logger.info(message)
         await interaction.response.send_message(message)
 
-    @tasks.loop(seconds=30.0)
-    async def archived_solved_puzzles_loop(self):
-        """Ref: https://discordpy.readthedocs.io/en/latest/ext/tasks/"""
+    def schedule_guild(self, guild_id: int, delay: datetime.timedelta):
+        """Wake up the archive scheduler for this guild after delay"""
+        self.archive_scheduler.schedule_in(guild_id, delay)
+
+    async def reschedule_guild(self, guild_id: int):
+        """Schedule the guild for its next archive/delete due time in the database, if any"""
+        due_time = await PuzzleDb.get_next_due_time(guild_id)
+        if due_time is not None:
+            self.archive_scheduler.schedule(guild_id, due_time)
+
+    async def rebuild_archive_schedule(self):
+        """Rebuild the archive schedule from the database, e.g. after a restart"""
         for guild in self.bot.guilds:
             try:
-                await self.archive_solved_puzzles(guild)
+                await self.reschedule_guild(guild.id)
             except Exception:
                 logger.exception(
-                    f"Unable to archive solved puzzles for guild {guild.id} {guild.name}"
+                    f"Unable to schedule archiving for guild {guild.id} {guild.name}"
                 )
-            try:
-                await self.process_deleted_puzzles(guild)
-            except Exception:
-                logger.exception(f"Unable to delete puzzles for guild {guild.id} {guild.name}")
+        logger.info(
+            f"Ready to start archiving solved puzzles, {len(self.archive_scheduler.queue)} scheduled"
+        )
 
-    @archived_solved_puzzles_loop.before_loop
-    async def before_archiving(self):
-        await self.bot.wait_until_ready()
-        logger.info("Ready to start archiving solved puzzles")
+    async def process_due_puzzles(self, guild_id: int):
+        """Called by the archive scheduler once puzzles in the guild may be due"""
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        try:
+            await self.archive_solved_puzzles(guild)
+        except Exception:
+            logger.exception(
+                f"Unable to archive solved puzzles for guild {guild.id} {guild.name}"
+            )
+        try:
+            await self.process_deleted_puzzles(guild)
+        except Exception:
+            logger.exception(f"Unable to delete puzzles for guild {guild.id} {guild.name}")
+        try:
+            due_time = await PuzzleDb.get_next_due_time(guild_id)
+        except Exception:
+            logger.exception(f"Unable to reschedule guild {guild.id} {guild.name}")
+            due_time = datetime.datetime.now(tz=pytz.UTC)
+        self.archive_scheduler.schedule_after_pass(guild_id, due_time)
 
     @commands.has_permissions(manage_channels=True)
     @app_commands.command()
     async def archive_hunt_channels(
         self, interaction: discord.Interaction, *,
-        archive_channel_id: str,  # channel id of archive channel
+        archive_channel_id: Optional[str],  # channel id of archive channel, for the discord target
         archive_hunt: Optional[str],
+        pack: bool = True,  # combine several messages into each archive post
+        streams: app_commands.Range[int, 1, 10] = 1,  # channels to copy concurrently, each into its own thread
+        webhooks: bool = False,  # post as the original authors, through a pool of webhooks
+        target: Literal["discord", "export"] = "discord",  # archive channel, or files on the bot's disk
     ):
         """Creates an archive channel of all messages from relevant text channels
 
         This copies non-bot messages into an archive channel to preserve
         messages while allowing the channels for old hunts to be cleaned up.
+        With the export target, channels are instead written to JSONL files
+        and HTML transcripts on the bot's disk. The JSONL files are compressed
+        with gzip, unless the optional zstandard package is installed.
         """
-        try:
-            archive_channel_id: int = int(archive_channel_id)
-        except Exception as exc:
-            await interaction.response.send_message(f"Failed to parse archive_channel_id integer: {exc!r}")
-            return
+        if target == "discord":
+            try:
+                archive_channel_id: int = int(archive_channel_id)
+            except Exception as exc:
+                await interaction.response.send_message(f"Failed to parse archive_channel_id integer: {exc!r}")
+                return
 
-        channels: list[int] = []
+        puzzles: list[PuzzleData] = []
         if not archive_hunt:
             puzzle_data = await self.get_puzzle_data_from_channel(interaction.channel)
             channel_id = puzzle_data.channel_id
             assert channel_id == interaction.channel.id
-            channels = [channel_id]
+            puzzles = [puzzle_data]
+        else:
+            hunt_id = await HuntSettings.get_id_for_name(interaction.guild.id, archive_hunt)
+            if hunt_id is None:
+                await interaction.response.send_message(
+                    f":exclamation: Hunt {archive_hunt} not found"
+                )
+                return
+            puzzles = await PuzzleDb.get_all(interaction.guild.id, hunt_id=hunt_id)
+        channels: list[int] = [puzzle.channel_id for puzzle in puzzles]
+
+        if target == "export":
+            export_name = "channels"
+            if archive_hunt:
+                export_name = self.clean_name(archive_hunt).replace("/", "-").lstrip(".")
+            destination = EXPORT_DIR / str(interaction.guild.id) / export_name
+            # Said in the output, as the zstandard package is optional
+            destination_text = f"{destination} (JSONL compressed with {compression()})"
+        else:
+            destination = f"<#{archive_channel_id}>"
+            destination_text = destination
+        # Archiving can outlast the interaction token, so report progress in a regular message
+        await interaction.response.send_message(
+            f"Archiving {len(channels)} channels to {destination_text}", ephemeral=True
+        )
+        status_message = await interaction.channel.send(
+            f"Archiving {len(channels)} channels to {destination_text} ..."
+        )
+        if target == "export":
+            summary = await self._export_channels(puzzles, destination, status_message)
         else:
-            puzzles = await PuzzleDb.get_all(interaction.guild.id)
-            channels = [puzzle.channel_id for puzzle in puzzles]
+            summary = await self._archive_channels_final(
+                self.bot,
+                channels,
+                archive_channel_id,
+                pack=pack,
+                streams=streams,
+                webhooks=webhooks,
+                status_message=status_message,
+            )
+        archived = sum(1 for item in summary if "Archived" in item)
+        await status_message.edit(
+            content=f"Archived {archived}/{len(channels)} channels to {destination_text}"
+        )
 
-        await self._archive_channels_final(self.bot, channels, archive_channel_id)
-        await interaction.response.send_message(f"Archived {len(channels)} channels to <#{archive_channel_id}>")
+    async def _export_channels(
+        self,
+        puzzles: list[PuzzleData],
+        export_dir: Path,
+        status_message: Optional[discord.Message] = None,
+    ) -> list[str]:
+        """Export the puzzles' channels to disk, see bot.utils.export"""
+        progress = ArchiveProgress(len(puzzles))
+        summary: list[str] = []
+        async with aiohttp.ClientSession() as session:
+            exporter = ChannelExporter(export_dir, session, index=archive_index)
+            for puzzle in puzzles:
+                channel = self.bot.get_channel(puzzle.channel_id)
+                if not channel:
+                    logger.info(f"Skipping ID {puzzle.channel_id}: Channel not found.")
+                    summary.append(f"ID {puzzle.channel_id}: Skipped (Not Found)")
+                    progress.done_channels += 1
+                    await self._report_archive_progress(progress, status_message)
+                    continue
+                progress.active.add(channel.name)
+                try:
+                    _, hunt_name = await self._archive_search_names(channel, puzzle)
+                    count = await exporter.export_channel(channel, puzzle, hunt_name=hunt_name)
+                    summary.append(f"#{channel.name}: Archived ({count} messages)")
+                    progress.messages += count
+                except Exception as exc:
+                    logger.exception(f"Error exporting #{channel.name}")
+                    summary.append(f"#{channel.name}: Failed ({exc!r})")
+                finally:
+                    progress.active.discard(channel.name)
+                    progress.done_channels += 1
+                await self._report_archive_progress(progress, status_message)
+
+        logger.info(f"\n--- Export Summary ({export_dir}) ---")
+        for item in summary:
+            logger.info(item)
+        return summary
 
-    async def _archive_channels_final(self, bot, source_channel_ids: list[int], archive_channel_id: int, dry_run: bool = False):
+    async def _archive_channels_final(
+        self,
+        bot,
+        source_channel_ids: list[int],
+        archive_channel_id: int,
+        dry_run: bool = False,
+        pack: bool = True,
+        streams: int = 1,
+        webhooks: bool = False,
+        status_message: Optional[discord.Message] = None,
+    ) -> list[str]:
+        """Copy messages of the source channels into the archive channel
+
+        With pack, consecutive messages are combined into as few archive
+        posts as Discord's length and attachment limits allow. With several
+        streams, channels are copied concurrently, each into a thread of the
+        archive channel so that their messages do not interleave. With webhooks,
+        each stream posts through its own webhook (and so its own rate limit)
+        as the original message authors.
+        """
         archive_channel = bot.get_channel(archive_channel_id)
         if not archive_channel:
             logger.error("Error: Archive channel not found.")
-            return
+            return []
 
         if dry_run:
             logger.info("--- !!! DRY RUN ENABLED: No messages will be sent !!! ---")
 
-        # 1. Scan Archive Channel for existing records
-        logger.info("Scanning archive channel for previous records...")
-        existing_archives = set()
-        async for msg in archive_channel.history(limit=None):
-            if "--- 📂 **ARCHIVE START** ---" in msg.content:
+        # 1. Look up progress of previous runs into this archive channel
+        if not await ArchiveLedger.has_entries(archive_channel.id):
+            await self._seed_archive_ledger(archive_channel)
+        ledger = await ArchiveLedger.for_archive(archive_channel.id, source_channel_ids)
+
+        webhook_pool: Optional[asyncio.Queue] = None
+        if webhooks and not dry_run:
+            webhook_pool = asyncio.Queue()
+            for webhook in await self._get_archive_webhooks(archive_channel, streams):
+                webhook_pool.put_nowait(webhook)
+
+        progress = ArchiveProgress(len(source_channel_ids))
+        semaphore = asyncio.Semaphore(streams)
+
+        async def archive_stream(channel_id: int) -> str:
+            async with semaphore:
+                webhook = await webhook_pool.get() if webhook_pool is not None else None
                 try:
-                    # Extracts the ID from between the parentheses
-                    extracted_id = int(msg.content.split('id=')[1].split(')')[0])
-                    existing_archives.add(extracted_id)
-                except (IndexError, ValueError):
-                    continue
+                    return await self._archive_channel(
+                        bot,
+                        ArchiveTarget(archive_channel, webhook=webhook),
+                        channel_id,
+                        ledger.get(channel_id),
+                        dry_run=dry_run,
+                        pack=pack,
+                        use_thread=streams > 1,
+                        progress=progress,
+                        status_message=status_message,
+                        relay=relay,
+                    )
+                except Exception as exc:
+                    logger.exception(f"Error archiving channel {channel_id}")
+                    return f"ID {channel_id}: Failed ({exc!r})"
+                finally:
+                    if webhook is not None:
+                        webhook_pool.put_nowait(webhook)
+                    progress.done_channels += 1
+
+        async with AttachmentRelay() as relay:
+            summary = await asyncio.gather(
+                *[archive_stream(channel_id) for channel_id in source_channel_ids]
+            )
 
-        summary: list[str] = []
+        # Final Summary Report
+        logger.info("\n--- Execution Summary ---")
+        for item in summary:
+            logger.info(item)
+        logger.info(f"Attachments: {relay.stats()}")
+        return summary
 
-        for channel_id in source_channel_ids:
-            # Check if already archived
-            if channel_id in existing_archives:
-                logger.info(f"Skipping ID {channel_id}: Already exists in archive.")
-                summary.append(f"ID {channel_id}: Skipped (Duplicate)")
-                continue
+    async def _archive_channel(
+        self,
+        bot,
+        target: ArchiveTarget,
+        channel_id: int,
+        entry: Optional[ArchiveLedger],
+        dry_run: bool,
+        pack: bool,
+        use_thread: bool,
+        progress: ArchiveProgress,
+        status_message: Optional[discord.Message],
+        relay: AttachmentRelay,
+    ) -> str:
+        """Copy one source channel to the archive target, and return a summary line"""
+        archive_channel = target.channel
+        # Check if already archived
+        if entry is not None and entry.is_complete():
+            logger.info(f"Skipping ID {channel_id}: Already exists in archive.")
+            return f"ID {channel_id}: Skipped (Duplicate)"
+
+        source_channel = bot.get_channel(channel_id)
+        if not source_channel:
+            logger.info(f"Skipping ID {channel_id}: Channel not found.")
+            return f"ID {channel_id}: Skipped (Not Found)"
 
-            source_channel = bot.get_channel(channel_id)
-            if not source_channel:
-                logger.info(f"Skipping ID {channel_id}: Channel not found.")
-                summary.append(f"ID {channel_id}: Skipped (Not Found)")
-                continue
+        if dry_run:
+            # Only threads expose a message count, otherwise count the history
+            count = getattr(source_channel, "message_count", None)
+            if count is None:
+                count = 0
+                async for _ in source_channel.history(limit=None):
+                    count += 1
+            logger.info(f"[DRY RUN] Would archive #{source_channel.name} with {count} messages.")
+            return f"#{source_channel.name}: Ready ({count} messages)"
+
+        # 2. Resume an interrupted run, or start a new one. The start sentinel
+        # is written before the first message, and edited with the final count.
+        after = None
+        if entry is None:
+            entry = await ArchiveLedger.create(
+                guild_id=archive_channel.guild.id,
+                source_channel_id=source_channel.id,
+                archive_channel_id=archive_channel.id,
+                message_count=0,
+                start_time=datetime.datetime.now(tz=pytz.UTC),
+            )
+        else:
+            if entry.thread_id:
+                # Continue in the thread of the interrupted run
+                target.thread = archive_channel.guild.get_thread(
+                    entry.thread_id
+                ) or await bot.fetch_channel(entry.thread_id)
+            if entry.last_message_id:
+                logger.info(
+                    f"Resuming #{source_channel.name} after {entry.message_count} copied messages"
+                )
+                after = discord.Object(id=entry.last_message_id)
 
-            # 2. Count messages
-            count = 0
-            async for _ in source_channel.history(limit=None):
-                count += 1
+        puzzle_name, hunt_name = await self._archive_search_names(source_channel)
 
-            if dry_run:
-                logger.info(f"[DRY RUN] Would archive #{source_channel.name} with {count} messages.")
-                summary.append(f"#{source_channel.name}: Ready ({count} messages)")
-                continue
+        async def send(post: ArchivePost):
+            sent = await self._send_archive_post(
+                target, source_channel, entry, post, relay, use_thread
+            )
+            if sent is not None:
+                # Search results link to the archived copy, as the source channel may be deleted
+                await archive_index.add(
+                    IndexedMessage(
+                        message_id=source.id,
+                        guild_id=archive_channel.guild.id,
+                        channel_id=source_channel.id,
+                        channel_name=source_channel.name,
+                        puzzle_name=puzzle_name,
+                        hunt_name=hunt_name,
+                        author=source.author.display_name,
+                        created_at=source.created_at,
+                        content=source.content,
+                        jump_url=sent.jump_url,
+                    )
+                    for source in post.sources
+                )
+            progress.messages += post.message_count
 
-            # 3. Start Sentinel
-            await archive_channel.send(
-                f"--- 📂 **ARCHIVE START** ---\n"
-                f"**Channel:** #{source_channel.name} (category={source_channel.category} id={source_channel.id})\n"
-                f"**Message Count:** {count}\n"
-                f"----------------------------"
+        progress.active.add(source_channel.name)
+        try:
+            # 3. Copying Logic, in a single pass over the history
+            packer = MessagePacker(max_messages=None if pack else 1)
+            async for message in source_channel.history(limit=None, after=after, oldest_first=True):
+                text = ""
+                if message.content or message.attachments:
+                    author_name = None if target.webhook else message.author.display_name
+                    text = message_header(author_name, message.created_at) + message.content
+                author = message.author if target.webhook else None
+                for post in packer.add(
+                    message.id, text, message.attachments, author=author, source=message
+                ):
+                    await send(post)
+                    await self._report_archive_progress(progress, status_message)
+            for post in packer.flush():
+                await send(post)
+
+            # 4. Patch the start sentinel with the final count, and End Sentinel
+            count = entry.message_count
+            if entry.start_message_id is None:
+                await self._send_archive_start(target, source_channel, entry, use_thread, count)
+            else:
+                await archive_channel.get_partial_message(entry.start_message_id).edit(
+                    content=self._archive_start_text(source_channel, count)
+                )
+            await target.destination.send(
+                f"--- ✅ **ARCHIVE END: #{source_channel.name}** ---\n"
+                f"All {count} messages have been transferred."
             )
+            await entry.update(end_time=datetime.datetime.now(tz=pytz.UTC)).apply()
+        finally:
+            progress.active.discard(source_channel.name)
+        return f"#{source_channel.name}: Archived ({count} messages)"
+
+    async def _archive_search_names(
+        self, channel, puzzle: Optional[PuzzleData] = None
+    ) -> tuple[str, str]:
+        """Puzzle and hunt name of a channel, for the archive search index"""
+        if puzzle is None:
+            try:
+                puzzle = await PuzzleDb.get(channel.guild.id, channel.id)
+            except MissingPuzzleError:
+                return (channel.name, "")
+        hunt_name = ""
+        round_data = await RoundData.query_by_category(puzzle.round_id)
+        if round_data is not None:
+            hunt = await HuntSettings.get(round_data.hunt_id)
+            if hunt is not None:
+                hunt_name = hunt.hunt_name or ""
+        return (puzzle.name or channel.name, hunt_name)
 
-            # 4. Copying Logic
-            async for message in source_channel.history(limit=None, oldest_first=True):
-                if not message.content and not message.attachments:
-                    continue
+    @app_commands.command()
+    async def search_archive(
+        self,
+        interaction: discord.Interaction,
+        query: str,
+        limit: app_commands.Range[int, 1, 25] = 10,
+    ):
+        """Search messages of archived puzzle channels"""
+        results = await archive_index.search(interaction.guild.id, query, limit=limit)
+        if not results:
+            await interaction.response.send_message(f"No archived messages found for `{query}`")
+            return
+        description = ""
+        for result in results:
+            hunt = f" ({result.hunt_name})" if result.hunt_name else ""
+            line = (
+                f"**{result.author}** in #{result.channel_name}{hunt}, {result.created_at[:10]}: "
+                f"{result.snippet} [jump]({result.jump_url})\n"
+            )
+            if len(description) + len(line) > 4096:  # embed description limit
+                break
+            description += line
+        embed = discord.Embed(title=f"Archive search: {query}"[:256], description=description)
+        await interaction.response.send_message(embed=embed)
 
-                header = f"**{message.author.display_name}** [{message.created_at.strftime('%Y-%m-%d %H:%M')}]:\n"
-                full_content = (header + message.content)[:2000]
+    async def _get_archive_webhooks(self, archive_channel, count: int) -> List[discord.Webhook]:
+        """Return count webhooks of the bot on the archive channel, creating them as needed"""
+        webhooks = [
+            webhook
+            for webhook in await archive_channel.webhooks()
+            if webhook.user == self.bot.user and webhook.name.startswith(self.ARCHIVE_WEBHOOK_NAME)
+        ]
+        while len(webhooks) < count:
+            webhooks.append(
+                await archive_channel.create_webhook(
+                    name=f"{self.ARCHIVE_WEBHOOK_NAME}-{len(webhooks) + 1}",
+                    reason="Archiving hunt channels",
+                )
+            )
+        return webhooks[:count]
+
+    async def _report_archive_progress(
+        self, progress: ArchiveProgress, status_message: Optional[discord.Message]
+    ):
+        if status_message is None or not progress.should_report():
+            return
+        try:
+            await status_message.edit(content=progress.text())
+        except discord.HTTPException:
+            logger.exception("Unable to update archive status message")
 
+    async def _send_archive_post(
+        self,
+        target: ArchiveTarget,
+        source_channel,
+        entry: ArchiveLedger,
+        post: ArchivePost,
+        relay: AttachmentRelay,
+        use_thread: bool = False,
+    ) -> Optional[discord.Message]:
+        """Send the post, and return the archive message if sent"""
+        message = None
+        if not post.is_empty():
+            if entry.start_message_id is None:
+                await self._send_archive_start(target, source_channel, entry, use_thread)
+            relayed = await relay.fetch_all(post.attachments, target.channel.guild.filesize_limit)
+            try:
+                # Not caught below, so that the ledger does not advance past the post
+                uploads = relay.uploads(relayed)
                 try:
-                    files = [await a.to_file() for a in message.attachments]
-                    await archive_channel.send(content=full_content, files=files)
-                    await asyncio.sleep(0.6) # Anti-spam buffer
+                    # Rate limits are handled by discord.py, which waits for the bucket to reset
+                    message = await target.send_post(post, uploads, links=relay.links(relayed))
                 except Exception:
                     logger.exception(f"Error copying message in #{source_channel.name}")
+            finally:
+                relay.finish(relayed, message)
+
+        if post.message_count:
+            # Record progress, so that an interrupted run resumes after this post
+            await entry.update(
+                last_message_id=post.last_message_id,
+                message_count=entry.message_count + post.message_count,
+            ).apply()
+        return message
 
-            # 5. End Sentinel
-            await archive_channel.send(
-                f"--- ✅ **ARCHIVE END: #{source_channel.name}** ---\n"
-                f"All {count} messages have been transferred."
+    async def _seed_archive_ledger(self, archive_channel: discord.TextChannel):
+        """Record channels archived before the ledger existed as complete
+
+        Scans the archive channel for ARCHIVE START sentinels, once, as there are
+        no ledger entries for the archive channel yet.
+        """
+        logger.info(f"Scanning #{archive_channel.name} for archives without ledger entries...")
+        count = 0
+        async for message in archive_channel.history(limit=None):
+            parsed = parse_archive_start(message.content)
+            if parsed is None:
+                continue
+            source_channel_id, message_count = parsed
+            await get_or_insert(
+                ArchiveLedger,
+                ["source_channel_id", "archive_channel_id"],
+                guild_id=archive_channel.guild.id,
+                source_channel_id=source_channel_id,
+                archive_channel_id=archive_channel.id,
+                start_message_id=message.id,
+                message_count=message_count,
+                start_time=message.created_at,
+                end_time=message.created_at,
             )
-            summary.append(f"#{source_channel.name}: Archived ({count} messages)")
+            count += 1
+        logger.info(f"Seeded {count} ledger entries for #{archive_channel.name}")
+
+    @staticmethod
+    def _archive_start_text(source_channel, count: Optional[int] = None) -> str:
+        count_text = "(in progress)" if count is None else count
+        return (
+            f"{ARCHIVE_START_MARKER}\n"
+            f"**Channel:** #{source_channel.name} (category={source_channel.category} id={source_channel.id})\n"
+            f"**Message Count:** {count_text}\n"
+            f"----------------------------"
+        )
 
-        # Final Summary Report
-        logger.info("\n--- Execution Summary ---")
-        for item in summary:
-            logger.info(item)
+    async def _send_archive_start(
+        self,
+        target: ArchiveTarget,
+        source_channel,
+        entry: ArchiveLedger,
+        use_thread: bool = False,
+        count: Optional[int] = None,
+    ):
+        start_message = await target.channel.send(self._archive_start_text(source_channel, count))
+        thread_id = None
+        if use_thread:
+            target.thread = await start_message.create_thread(name=source_channel.name[:100])
+            thread_id = target.thread.id
+        await entry.update(start_message_id=start_message.id, thread_id=thread_id).apply()
 
 
 async def setup(bot):
@@ -7,14 +7,49 @@ from discord import app_commands
 import pytz
 
 from bot.base_cog import BaseCog, GeneralAppError
-from bot.data.puzzle_db import PuzzleDb
+from bot.data.puzzle_db import PuzzleDb, PuzzleListRow
 from bot.utils import urls
 from bot import database
-from bot.database.models import PuzzleData, PuzzleNotes
+from bot.database.models import HuntSettings, PuzzleData, PuzzleNotes
 
 logger = logging.getLogger(__name__)
 
 
+def puzzle_list_embed(puzzles: List[PuzzleListRow]) -> discord.Embed:
+    """Embed for /list_puzzles, with a field per round (or per part of a long round)"""
+    embed = discord.Embed()
+    cur_round = None
+    message = ""
+
+    if len(puzzles) == 0:
+        cur_round = ""
+        message = "No puzzles to list"
+
+    # Create a message with a new embed field per round,
+    # listing all puzzles in the embed field
+    for puzzle in puzzles:
+        if cur_round is None:
+            cur_round = puzzle.round_name
+        if puzzle.round_name != cur_round or len(message) >= 512:
+            # Reached next round, add new embed field
+            embed.add_field(name=cur_round, value=message)
+            cur_round = puzzle.round_name
+            message = ""
+        message += f"{puzzle.channel_mention}"
+        if puzzle.puzzle_type:
+            message += f" type:{puzzle.puzzle_type}"
+        if puzzle.solution:
+            message += f" sol:**{puzzle.solution}**"
+        elif puzzle.status:
+            message += f" status:{puzzle.status}"
+        message += "\n"
+
+    if len(message) > 0:
+        # Add any dangling fields to our output
+        embed.add_field(name=cur_round, value=message)
+    return embed
+
+
 class PuzzleManagement(BaseCog):
     PRIORITIES = ["low", "medium", "high", "very high"]
 
@@ -29,44 +64,26 @@ class PuzzleManagement(BaseCog):
         return "-".join(name.lower().split())
 
     @app_commands.command()
-    async def list_puzzles(self, interaction: discord.Interaction):
-        """*List all puzzles and their statuses*"""
+    async def list_puzzles(self, interaction: discord.Interaction, hunt: Optional[str] = None):
+        """*List all puzzles and their statuses, in the given or the only active hunt*"""
         if not (await self.check_is_bot_channel(interaction)):
             return
 
-        all_puzzles = await PuzzleDb.get_all(interaction.guild.id)
-
-        embed = discord.Embed()
-        cur_round = None
-        message = ""
-
-        if len(all_puzzles) == 0:
-            cur_round = ""
-            message = "No puzzles to list"
-
-        # Create a message with a new embed field per round,
-        # listing all puzzles in the embed field
-        for puzzle in all_puzzles:
-            if cur_round is None:
-                cur_round = puzzle.round_name
-            if puzzle.round_name != cur_round or len(message) >= 512:
-                # Reached next round, add new embed field
-                embed.add_field(name=cur_round, value=message)
-                cur_round = puzzle.round_name
-                message = ""
-            message += f"{puzzle.channel_mention}"
-            if puzzle.puzzle_type:
-                message += f" type:{puzzle.puzzle_type}"
-            if puzzle.solution:
-                message += f" sol:**{puzzle.solution}**"
-            elif puzzle.status:
-                message += f" status:{puzzle.status}"
-            message += "\n"
-
-        if len(message) > 0:
-            # Add any dangling fields to our output
-            embed.add_field(name=cur_round, value=message)
+        hunt_id = None
+        if hunt:
+            hunt_id = await HuntSettings.get_id_for_name(interaction.guild.id, hunt)
+            if hunt_id is None:
+                await interaction.response.send_message(f":exclamation: Hunt {hunt} not found")
+                return
+        else:
+            active_hunts = await HuntSettings.get_active_hunts(interaction.guild.id)
+            if len(active_hunts) == 1:
+                hunt_id = active_hunts[0].id
+        all_puzzles = await PuzzleDb.get_all(
+            interaction.guild.id, hunt_id=hunt_id, ordered=True, row_type=PuzzleListRow
+        )
 
+        embed = puzzle_list_embed(all_puzzles)
         if embed.fields:
             await interaction.response.send_message(embed=embed)
 
@@ -328,8 +345,14 @@ class PuzzleManagement(BaseCog):
         await puzzle_data.update(
             status="solved", solution=solution, solve_time=datetime.datetime.now(tz=pytz.UTC)
         ).apply()
+        PuzzleDb.cache(puzzle_data)
 
         settings = await database.query_guild(interaction.guild.id)
+        channel_cog = self.bot.get_cog("ChannelManagement")
+        if channel_cog is not None:
+            channel_cog.schedule_guild(
+                interaction.guild.id, datetime.timedelta(seconds=settings.archive_delay)
+            )
         emoji = settings.discord_bot_emoji or ""
         embed = discord.Embed(
             description=f"{emoji} :partying_face: Great work! Marked the solution as `{solution}`"
@@ -8,20 +8,24 @@ can be easily disabled; simply omit this file.
 import datetime
 import logging
 import string
+from typing import List, Optional
+
 import pytz
 
 import discord
 from discord.ext import tasks
+import gspread
 import gspread_asyncio
 import gspread_formatting
 
 from bot.base_cog import BaseCog
+from bot.data.puzzle_db import MissingPuzzleError, NexusRow, PuzzleDb
 from bot.utils import urls
-from bot.utils.gdrive import get_or_create_folder, rename_file
+from bot.utils.gdrive import drive, forget_folder, get_or_create_folder, rename_file
 from bot.utils.gsheet import copy_spreadsheet, create_spreadsheet, get_manager
 from bot.utils.gsheet_nexus import update_nexus
 from bot import database
-from bot.database.models import GuildSettings, HuntSettings, PuzzleData, RoundData
+from bot.database.models import GuildSettings, HuntSettings, JobData, PuzzleData, RoundData
 
 logger = logging.getLogger(__name__)
 
@@ -29,22 +33,73 @@ logger = logging.getLogger(__name__)
 class GoogleSheets(BaseCog):
     agcm = get_manager()
 
+    # Kinds of background jobs, see bot.data.job_queue
+    CREATE_SPREADSHEET_JOB = "create_puzzle_spreadsheet"
+    ARCHIVE_SPREADSHEET_JOB = "archive_puzzle_spreadsheet"
+
+    QUICK_LINKS_TITLE = "Quick Links"
+
     def __init__(self, bot):
         self.stale_hunt_days = 90
         self.bot = bot
+        bot.job_queue.register(
+            self.CREATE_SPREADSHEET_JOB,
+            self.run_create_spreadsheet_job,
+            on_failure=self.report_create_spreadsheet_failure,
+        )
+        bot.job_queue.register(self.ARCHIVE_SPREADSHEET_JOB, self.run_archive_spreadsheet_job)
+        # hunt_id -> (nexus sheet id, puzzle update_time) as of the last nexus update
+        self.nexus_versions = {}
+        # nexus sheet id -> rows last written to the sheet
+        self.nexus_rows = {}
 
     def begin_loops(self):
         logger.info("Beginning loops")
         self.refresh_nexus.start()
         self.refresh_stale_nexus.start()
 
+    async def cog_unload(self):
+        self.bot.job_queue.unregister(self.CREATE_SPREADSHEET_JOB)
+        self.bot.job_queue.unregister(self.ARCHIVE_SPREADSHEET_JOB)
+        await drive.close()
+
     def cap_name(self, name):
         """Capitalize name for easy comprehension"""
         return string.capwords(name.replace("-", " "))
 
+    async def enqueue_puzzle_spreadsheet(self, puzzle: PuzzleData):
+        """Create the puzzle's spreadsheet in the background, see create_puzzle_spreadsheet"""
+        await self.bot.job_queue.enqueue(
+            puzzle.guild_id, self.CREATE_SPREADSHEET_JOB, {"channel_id": puzzle.channel_id}
+        )
+
+    async def run_create_spreadsheet_job(self, job: JobData):
+        try:
+            puzzle = await PuzzleDb.get(job.guild_id, job.payload["channel_id"])
+        except MissingPuzzleError:
+            logger.info(f"Puzzle for job {job.id} no longer exists, not creating spreadsheet")
+            return
+        text_channel = self.bot.get_channel(puzzle.channel_id)
+        if text_channel is None or puzzle.delete_time is not None:
+            logger.info(f"Channel for job {job.id} no longer exists, not creating spreadsheet")
+            return
+        await self.create_puzzle_spreadsheet(text_channel, puzzle)
+
+    async def report_create_spreadsheet_failure(self, job: JobData, exc: Exception):
+        text_channel = self.bot.get_channel(job.payload["channel_id"])
+        if text_channel is not None:
+            await text_channel.send(
+                f":exclamation: Unable to create spreadsheet for {text_channel.mention}: {exc}"
+            )
+
     async def create_puzzle_spreadsheet(
         self, text_channel: discord.TextChannel, puzzle: PuzzleData
     ):
+        """Create the puzzle's spreadsheet and post a link to it in the channel
+
+        Raises on failure, and may be retried: a spreadsheet created by an earlier
+        attempt is reused.
+        """
         guild_id = text_channel.guild.id
         name = self.cap_name(puzzle.name)
         round_name = self.cap_name(puzzle.round_name)
@@ -55,75 +110,109 @@ class GoogleSheets(BaseCog):
         hunt_settings = await database.query_hunt_settings_by_round(guild_id, puzzle.round_id)
         if not hunt_settings.drive_hunt_folder_id:
             return
-
-        try:
+        guild_settings = await database.query_guild(guild_id)
+
+        if puzzle.google_sheet_id:
+            # Created by an earlier attempt
+            agc = await self.agcm.authorize()
+            spreadsheet = await agc.open_by_key(puzzle.google_sheet_id)
+            worksheet_titles = [worksheet.title for worksheet in await spreadsheet.worksheets()]
+        else:
             # default to storing everything in with the hunt
             round_folder_id = hunt_settings.drive_hunt_folder_id
 
             # create drive folder if needed.  If the round is the same name as the hunt, just keep it at the top level.
+            round_data = None
             if hunt_settings.hunt_name != puzzle.round_name:
-                round_folder = await get_or_create_folder(
-                    name=round_name, parent_id=hunt_settings.drive_hunt_folder_id
+                round_data = await RoundData.query_by_category(puzzle.round_id)
+                round_folder_id = await self.get_round_folder_id(
+                    round_data, round_name, hunt_settings
                 )
-                round_folder_id = round_folder["id"]
 
-            guild_settings = await database.query_guild(guild_id)
-            if guild_settings.drive_starter_sheet_id:
-                spreadsheet = await copy_spreadsheet(
-                    agcm=self.agcm,
-                    source_id=guild_settings.drive_starter_sheet_id,
-                    title=name,
-                    folder_id=round_folder_id,
+            try:
+                spreadsheet = await self.create_sheet_in_folder(
+                    guild_settings, name, round_folder_id
                 )
-            else:
-                spreadsheet = await create_spreadsheet(
-                    agcm=self.agcm, title=name, folder_id=round_folder_id
+            except gspread.exceptions.APIError as exc:
+                if exc.code != 404 or round_folder_id == hunt_settings.drive_hunt_folder_id:
+                    raise
+                # The cached round folder was deleted in the meantime, look it up again
+                logger.warning(f"Round folder {round_folder_id} for {round_name} not found: {exc}")
+                forget_folder(round_folder_id)
+                if round_data is not None:
+                    await round_data.update(drive_folder_id=None).apply()
+                round_folder_id = await self.get_round_folder_id(
+                    round_data, round_name, hunt_settings
+                )
+                spreadsheet = await self.create_sheet_in_folder(
+                    guild_settings, name, round_folder_id
                 )
             await puzzle.update(
                 google_folder_id=round_folder_id, google_sheet_id=spreadsheet.id
             ).apply()
+            PuzzleDb.cache(puzzle)
+            worksheet_titles = []
 
-            # inform spreadsheet creation
-            puzzle_url = puzzle.hunt_url
-            sheet_url = urls.spreadsheet_url(spreadsheet.id)
-            emoji = guild_settings.discord_bot_emoji
-            embed = discord.Embed(
-                description=f"{emoji} I've created a spreadsheet for you at {sheet_url}. "
-                f"Check out the `Quick Links` tab for more info! "
-                # NOTE: This next sentence might be better elsewhere, for now easy enough to add message here.
-                f"I've assumed the puzzle page is {puzzle_url}, use `/link` to update if needed."
-            )
-            
-            # Check if we should edit the first message instead of sending a new one
-            if guild_settings.sticky_first_message:
-                # Get the first message in the channel to edit it instead of sending a new message
-                async for message in text_channel.history(limit=1):
-                    if message.author == self.bot.user:
-                        # Edit the first bot message instead of sending a new one
-                        # Append the new embed content after the existing message text
-                        new_content = message.embeds[0]
-                        new_content.add_field(name="Spreadsheet", value=embed.description)
-                        await message.edit(embed=new_content)
-                        await message.pin()
-                        break
-                else:
-                    # If no bot message found, send a new message (fallback)
-                    await text_channel.send(embed=embed)
+        # add some helpful links
+        if self.QUICK_LINKS_TITLE not in worksheet_titles:
+            await self.add_quick_links_worksheet(spreadsheet, puzzle, guild_settings, hunt_settings)
+
+        # inform spreadsheet creation
+        puzzle_url = puzzle.hunt_url
+        sheet_url = urls.spreadsheet_url(spreadsheet.id)
+        emoji = guild_settings.discord_bot_emoji
+        embed = discord.Embed(
+            description=f"{emoji} I've created a spreadsheet for you at {sheet_url}. "
+            f"Check out the `Quick Links` tab for more info! "
+            # NOTE: This next sentence might be better elsewhere, for now easy enough to add message here.
+            f"I've assumed the puzzle page is {puzzle_url}, use `/link` to update if needed."
+        )
+
+        # Check if we should edit the first message instead of sending a new one
+        if guild_settings.sticky_first_message:
+            # Get the first message in the channel to edit it instead of sending a new message
+            async for message in text_channel.history(limit=1):
+                if message.author == self.bot.user:
+                    # Edit the first bot message instead of sending a new one
+                    # Append the new embed content after the existing message text
+                    new_content = message.embeds[0]
+                    new_content.add_field(name="Spreadsheet", value=embed.description)
+                    await message.edit(embed=new_content)
+                    await message.pin()
+                    break
             else:
-                # Default behavior - send a new message
+                # If no bot message found, send a new message (fallback)
                 await text_channel.send(embed=embed)
+        else:
+            # Default behavior - send a new message
+            await text_channel.send(embed=embed)
 
-            # add some helpful links
-            await self.add_quick_links_worksheet(spreadsheet, puzzle, guild_settings, hunt_settings)
+        return spreadsheet
 
-        except Exception as exc:
-            logger.exception(f"Unable to create spreadsheet for {round_name}/{name}")
-            await text_channel.send(
-                f":exclamation: Unable to create spreadsheet for {round_name}/{name}: {exc}"
+    async def get_round_folder_id(
+        self, round_data: Optional[RoundData], round_name: str, hunt_settings: HuntSettings
+    ) -> str:
+        """Return the drive folder for the round, creating it on first use"""
+        if round_data is not None and round_data.drive_folder_id:
+            return round_data.drive_folder_id
+        round_folder = await get_or_create_folder(
+            name=round_name, parent_id=hunt_settings.drive_hunt_folder_id
+        )
+        if round_data is not None:
+            await round_data.update(drive_folder_id=round_folder["id"]).apply()
+        return round_folder["id"]
+
+    async def create_sheet_in_folder(
+        self, guild_settings: GuildSettings, name: str, folder_id: str
+    ) -> gspread_asyncio.AsyncioGspreadSpreadsheet:
+        if guild_settings.drive_starter_sheet_id:
+            return await copy_spreadsheet(
+                agcm=self.agcm,
+                source_id=guild_settings.drive_starter_sheet_id,
+                title=name,
+                folder_id=folder_id,
             )
-            return
-
-        return spreadsheet
+        return await create_spreadsheet(agcm=self.agcm, title=name, folder_id=folder_id)
 
     async def create_hunt_drive(
         self, guild_id: int, text_channel: discord.TextChannel, hunt: HuntSettings
@@ -186,7 +275,7 @@ class GoogleSheets(BaseCog):
         guild_settings: GuildSettings,
         hunt_settings: HuntSettings,
     ):
-        worksheet = await spreadsheet.add_worksheet(title="Quick Links", rows=10, cols=2)
+        worksheet = await spreadsheet.add_worksheet(title=self.QUICK_LINKS_TITLE, rows=10, cols=2)
         cell_range = await worksheet.range(1, 1, 10, 2)
 
         self.update_cell_row(cell_range, 1, "Hunt URL", puzzle.hunt_url)
@@ -227,6 +316,22 @@ class GoogleSheets(BaseCog):
         # Not async
         gspread_formatting.set_column_width(worksheet.ws, "B", 1000)
 
+    async def enqueue_archive_spreadsheet(self, puzzle: PuzzleData):
+        """Rename the puzzle's spreadsheet in the background, see archive_puzzle_spreadsheet"""
+        if puzzle.google_sheet_id is None:
+            return
+        await self.bot.job_queue.enqueue(
+            puzzle.guild_id, self.ARCHIVE_SPREADSHEET_JOB, {"channel_id": puzzle.channel_id}
+        )
+
+    async def run_archive_spreadsheet_job(self, job: JobData):
+        try:
+            puzzle = await PuzzleDb.get(job.guild_id, job.payload["channel_id"])
+        except MissingPuzzleError:
+            logger.info(f"Puzzle for job {job.id} no longer exists, not archiving spreadsheet")
+            return
+        await self.archive_puzzle_spreadsheet(puzzle)
+
     async def archive_puzzle_spreadsheet(self, puzzle: PuzzleData) -> dict:
         def archive_puzzle_name(sheet_name):
             if "SOLVED" in sheet_name:
@@ -248,30 +353,46 @@ class GoogleSheets(BaseCog):
 
     @tasks.loop(seconds=60.0)
     async def refresh_nexus(self):
-        """Ref: https://discordpy.readthedocs.io/en/latest/ext/tasks/"""
-        hunts = await HuntSettings.query.gino.all()
+        """Ref: https://discordpy.readthedocs.io/en/latest/ext/tasks/
+
+        Only hunts with a puzzle updated since the last refresh are rewritten.
+        """
         now = datetime.datetime.now(tz=pytz.UTC)
+        hunts = [
+            hunt
+            for hunt in await HuntSettings.query.gino.all()
+            if hunt.drive_nexus_sheet_id and not self.hunt_is_stale(hunt, now)
+        ]
+        update_times = await PuzzleDb.get_hunt_update_times([hunt.id for hunt in hunts])
+        changed_hunts = []
         for hunt in hunts:
-            if not self.hunt_is_stale(hunt, now):
-                await self.update_nexus_sheet(hunt)
+            version = (hunt.drive_nexus_sheet_id, update_times.get(hunt.id))
+            if self.nexus_versions.get(hunt.id) != version:
+                changed_hunts.append((hunt, version))
+        if not changed_hunts:
+            return
+
+        puzzles_by_hunt = await PuzzleDb.get_puzzles_in_hunts([hunt.id for hunt, _ in changed_hunts])
+        for hunt, version in changed_hunts:
+            await self.update_nexus_sheet(hunt, puzzles_by_hunt[hunt.id])
+            self.nexus_versions[hunt.id] = version
 
     @refresh_nexus.before_loop
     async def before_refreshing_nexus(self):
         await self.bot.wait_until_ready()
         logger.info("Ready to start updating nexus spreadsheet")
 
-    async def update_nexus_sheet(self, hunt):
+    async def update_nexus_sheet(self, hunt, puzzles: Optional[List[NexusRow]] = None):
         if hunt.drive_nexus_sheet_id:
-            rounds = await RoundData.rounds_in_hunt(hunt)
-            puzzles = []
-            for round_data in rounds:
-                puzzles.extend(await PuzzleData.puzzles_in_round(round_data.category_id))
+            if puzzles is None:
+                puzzles = await PuzzleDb.get_puzzles_in_hunt(hunt.id)
             if puzzles:
-                await update_nexus(
+                self.nexus_rows[hunt.drive_nexus_sheet_id] = await update_nexus(
                     agcm=self.agcm,
                     file_id=hunt.drive_nexus_sheet_id,
                     puzzles=puzzles,
                     hunt_name=hunt.hunt_name,
+                    previous_rows=self.nexus_rows.get(hunt.drive_nexus_sheet_id),
                 )
 
     def hunt_is_stale(self, hunt, now=None):
@@ -9,6 +9,8 @@ import discord
 from discord import app_commands
 
 from bot.base_cog import BaseCog, GeneralAppError
+from bot.data.puzzle_db import PuzzleDb
+from bot.database.models import GuildSettings
 
 PY_VERSION = f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}"
 
@@ -64,6 +66,17 @@ class Utility(BaseCog):
             f"Shard ID: {interaction.guild.shard_id}```",
             inline=False,
         )
+        guild_cache = GuildSettings.cache_stats()
+        puzzle_cache = PuzzleDb.cache_stats()
+        embed.add_field(
+            name="Caches",
+            value=f"```py\n"
+            f"Guild settings: {guild_cache['size']} cached, "
+            f"{guild_cache['hits']} hits, {guild_cache['misses']} misses\n"
+            f"Puzzle channels: {puzzle_cache['size']} cached, "
+            f"{puzzle_cache['hits']} hits, {puzzle_cache['misses']} misses```",
+            inline=False,
+        )
         embed.add_field(
             name="Software Versions",
             value=f"```py\n"
@@ -0,0 +1,134 @@
+"""
+Wake up exactly when solved puzzles are due to be archived, or when puzzles
+marked via /delete are due to be deleted, instead of polling every guild.
+"""
+import asyncio
+import datetime
+import heapq
+import itertools
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+
+class DueQueue:
+    """Time-ordered heap of (due_time, guild_id) entries
+
+    Entries are never cancelled: processing a guild early or more than once is
+    harmless, as the database is always re-checked for what is actually due.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime.datetime, int, int]] = []
+        self._counter = itertools.count()
+
+    def push(self, due_time: datetime.datetime, guild_id: int):
+        heapq.heappush(self._heap, (due_time, next(self._counter), guild_id))
+
+    def peek(self) -> Optional[datetime.datetime]:
+        if not self._heap:
+            return None
+        return self._heap[0][0]
+
+    def pop_due(self, now: datetime.datetime) -> Set[int]:
+        """Remove and return the guild ids of all entries due at or before now"""
+        guild_ids = set()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, guild_id = heapq.heappop(self._heap)
+            guild_ids.add(guild_id)
+        return guild_ids
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class ArchiveScheduler:
+    """Runs ``callback(guild_id)`` for each guild once its next due time is reached
+
+    The scheduler sleeps until the earliest due time in the queue (or forever if
+    the queue is empty), and is woken up early whenever a new entry is scheduled.
+    """
+
+    # Slack added to due times, so that the database cutoff has passed when woken up
+    GRACE = datetime.timedelta(seconds=1)
+    # Backoff for guilds whose puzzles are still due after being processed
+    RETRY_DELAY = datetime.timedelta(seconds=30)
+    MAX_RETRY_DELAY = datetime.timedelta(minutes=30)
+
+    def __init__(self, callback: Callable[[int], Awaitable[None]]):
+        self.callback = callback
+        self.queue = DueQueue()
+        # guild_id -> number of consecutive passes after which puzzles were still due
+        self.failures: Dict[int, int] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.is_running():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def schedule(self, guild_id: int, due_time: datetime.datetime):
+        self.queue.push(due_time + self.GRACE, guild_id)
+        self._wakeup.set()
+
+    def schedule_in(self, guild_id: int, delay: datetime.timedelta):
+        self.schedule(guild_id, datetime.datetime.now(tz=pytz.UTC) + delay)
+
+    @classmethod
+    def retry_delay(cls, failures: int) -> datetime.timedelta:
+        """Exponential backoff after the given number of consecutive failed passes"""
+        delay = cls.RETRY_DELAY
+        for _ in range(1, failures):
+            delay *= 2
+            if delay >= cls.MAX_RETRY_DELAY:
+                return cls.MAX_RETRY_DELAY
+        return delay
+
+    def schedule_after_pass(self, guild_id: int, due_time: Optional[datetime.datetime]):
+        """Schedule the guild's next due time after it was processed
+
+        If puzzles are still due, e.g. because archiving them keeps failing, the
+        guild is retried with backoff instead of right away.
+        """
+        now = datetime.datetime.now(tz=pytz.UTC)
+        if due_time is None or due_time > now:
+            self.failures.pop(guild_id, None)
+            if due_time is not None:
+                self.schedule(guild_id, due_time)
+            return
+        failures = self.failures[guild_id] = self.failures.get(guild_id, 0) + 1
+        delay = self.retry_delay(failures)
+        logger.warning(
+            f"Puzzles in guild {guild_id} are still due after {failures} passes, retrying in {delay}"
+        )
+        self.schedule_in(guild_id, delay)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            for guild_id in self.queue.pop_due(datetime.datetime.now(tz=pytz.UTC)):
+                try:
+                    await self.callback(guild_id)
+                except Exception:
+                    logger.exception(f"Unable to process due puzzles for guild {guild_id}")
+
+            timeout = None
+            next_due = self.queue.peek()
+            if next_due is not None:
+                now = datetime.datetime.now(tz=pytz.UTC)
+                timeout = max(0.0, (next_due - now).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
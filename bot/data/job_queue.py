@@ -0,0 +1,199 @@
+"""
+Persistent queue of background jobs, so that slow Google Drive calls do not
+hold up slash commands or the archive scheduler.
+
+Jobs are stored in the job_data table, so that they survive restarts, and are
+drained by a fixed number of workers. Failed jobs are retried with exponential
+backoff.
+"""
+import asyncio
+import datetime
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import pytz
+
+from bot.database import db
+from bot.database.models import JobData
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[JobData], Awaitable[None]]
+FailureHandler = Callable[[JobData, Exception], Awaitable[None]]
+
+
+class JobQueue:
+    MAX_ATTEMPTS = 5
+    BASE_RETRY_DELAY = datetime.timedelta(seconds=10)
+    MAX_RETRY_DELAY = datetime.timedelta(minutes=10)
+    # Idle workers re-check the table at least this often, in seconds
+    POLL_INTERVAL = 60.0
+    # Finished jobs are kept around this long for debugging
+    KEEP_DONE = datetime.timedelta(days=7)
+
+    def __init__(self, workers: int = 2):
+        self.workers = max(1, workers)
+        self.handlers: Dict[str, JobHandler] = {}
+        self.failure_handlers: Dict[str, FailureHandler] = {}
+        # Created in start(), so that it belongs to the running event loop
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, kind: str, handler: JobHandler, on_failure: Optional[FailureHandler] = None):
+        """Register the handler for a kind of job
+
+        on_failure is called once the job has failed MAX_ATTEMPTS times.
+        Jobs whose kind has no handler (e.g. the cog is not loaded) stay pending.
+        """
+        self.handlers[kind] = handler
+        if on_failure is not None:
+            self.failure_handlers[kind] = on_failure
+        self._wake()
+
+    def unregister(self, kind: str):
+        self.handlers.pop(kind, None)
+        self.failure_handlers.pop(kind, None)
+
+    async def enqueue(
+        self,
+        guild_id: int,
+        kind: str,
+        payload: dict,
+        delay: Optional[datetime.timedelta] = None,
+    ) -> JobData:
+        run_time = datetime.datetime.now(tz=pytz.UTC) + (delay or datetime.timedelta())
+        job = await JobData.create(
+            guild_id=guild_id, kind=kind, payload=payload, run_time=run_time
+        )
+        self._wake()
+        return job
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.is_running():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @classmethod
+    def retry_delay(cls, attempts: int) -> datetime.timedelta:
+        """Exponential backoff after the given number of failed attempts"""
+        delay = cls.BASE_RETRY_DELAY
+        for _ in range(1, attempts):
+            delay *= 2
+            if delay >= cls.MAX_RETRY_DELAY:
+                return cls.MAX_RETRY_DELAY
+        return delay
+
+    async def recover(self):
+        """Requeue jobs interrupted by a restart, and drop old finished jobs"""
+        await JobData.update.values(status=JobData.PENDING).where(
+            JobData.status == JobData.RUNNING
+        ).gino.status()
+        await JobData.delete.where(
+            (JobData.status == JobData.DONE)
+            & (JobData.update_time < datetime.datetime.now(tz=pytz.UTC) - self.KEEP_DONE)
+        ).gino.status()
+
+    async def claim(self) -> Optional[JobData]:
+        """Mark the next due job as running and return it, if any"""
+        if not self.handlers:
+            return None
+        next_id = db.select([JobData.id]).where(
+            (JobData.status == JobData.PENDING)
+            & (JobData.run_time <= db.func.now())
+            & JobData.kind.in_(list(self.handlers))
+        ).order_by(JobData.run_time).limit(1).with_for_update(skip_locked=True).as_scalar()
+        return await JobData.update.values(
+            status=JobData.RUNNING, attempts=JobData.attempts + 1
+        ).where(JobData.id == next_id).returning(
+            *JobData.__table__.columns
+        ).gino.load(JobData).first()
+
+    async def next_run_time(self) -> Optional[datetime.datetime]:
+        if not self.handlers:
+            return None
+        return await db.select([db.func.min(JobData.run_time)]).where(
+            (JobData.status == JobData.PENDING) & JobData.kind.in_(list(self.handlers))
+        ).gino.scalar()
+
+    async def run_job(self, job: JobData):
+        try:
+            await self.handlers[job.kind](job)
+        except Exception as exc:
+            if job.attempts < self.MAX_ATTEMPTS:
+                delay = self.retry_delay(job.attempts)
+                logger.warning(
+                    f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}, "
+                    f"retrying in {delay}: {exc!r}"
+                )
+                await job.update(
+                    status=JobData.PENDING,
+                    run_time=datetime.datetime.now(tz=pytz.UTC) + delay,
+                    last_error=repr(exc),
+                ).apply()
+                return
+
+            logger.exception(f"Job {job.id} ({job.kind}) failed after {job.attempts} attempts")
+            await job.update(status=JobData.FAILED, last_error=repr(exc)).apply()
+            on_failure = self.failure_handlers.get(job.kind)
+            if on_failure is not None:
+                try:
+                    await on_failure(job, exc)
+                except Exception:
+                    logger.exception(f"Unable to report failure of job {job.id} ({job.kind})")
+            return
+
+        await job.update(status=JobData.DONE).apply()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.recover()
+                break
+            except Exception:
+                logger.exception(
+                    f"Unable to recover background jobs, retrying in {self.POLL_INTERVAL}s"
+                )
+                await asyncio.sleep(self.POLL_INTERVAL)
+        workers: List[asyncio.Task] = [
+            asyncio.create_task(self._work()) for _ in range(self.workers)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def _work(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self.claim()
+                if job is not None:
+                    await self.run_job(job)
+                    continue
+                timeout = self.POLL_INTERVAL
+                run_time = await self.next_run_time()
+            except Exception:
+                logger.exception("Unable to process background jobs")
+                timeout = self.POLL_INTERVAL
+                run_time = None
+
+            if run_time is not None:
+                now = datetime.datetime.now(tz=pytz.UTC)
+                timeout = min(timeout, max(0.0, (run_time - now).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
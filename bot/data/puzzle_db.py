@@ -1,10 +1,12 @@
 import datetime
 import logging
-from typing import List
+from typing import Dict, List, NamedTuple, Optional, Type
 
 import pytz
 from bot import database
+from bot.database import db
 from bot.database.models import PuzzleData
+from bot.utils.cache import KeyedCache
 
 
 logger = logging.getLogger(__name__)
@@ -14,12 +16,148 @@ class MissingPuzzleError(RuntimeError):
     pass
 
 
+# Read-only rows with only the columns some paths need, see PuzzleDb.select_rows.
+# Field names match the PuzzleData columns they are selected from.
+
+
+class PuzzleListRow(NamedTuple):
+    """Columns shown by /list_puzzles"""
+
+    round_name: Optional[str]
+    channel_mention: Optional[str]
+    puzzle_type: Optional[str]
+    solution: Optional[str]
+    status: Optional[str]
+
+
+class NexusRow(NamedTuple):
+    """Columns written to the nexus sheet, see bot.utils.gsheet_nexus"""
+
+    hunt_id: Optional[int]
+    name: Optional[str]
+    round_name: Optional[str]
+    channel_mention: Optional[str]
+    hunt_url: Optional[str]
+    google_sheet_id: Optional[str]
+    status: Optional[str]
+    solution: Optional[str]
+    priority: Optional[str]
+    puzzle_type: Optional[str]
+    start_time: Optional[datetime.datetime]
+    solve_time: Optional[datetime.datetime]
+
+
+class PuzzleDeleteRow(NamedTuple):
+    """Columns needed to delete a puzzle's channels"""
+
+    id: int
+    name: Optional[str]
+    round_name: Optional[str]
+    channel_id: int
+    voice_channel_id: Optional[int]
+    delete_request: Optional[datetime.datetime]
+    solve_time: Optional[datetime.datetime]
+    archive_time: Optional[datetime.datetime]
+
+
 class PuzzleDb:
+    # Time after /delete at which the puzzle channel is actually deleted
+    DELETE_DELAY = datetime.timedelta(minutes=5)
+
+    # Resident map of channel_id -> PuzzleData, so that puzzle channel commands
+    # can look up their puzzle without a query. Instances are shared with callers,
+    # so in-place updates via ``puzzle_data.update(...).apply()`` stay visible.
+    # Paths writing through other instances or bulk UPDATEs must re-cache or
+    # uncache the puzzle; the TTL bounds staleness from writes outside the bot.
+    CACHE_TTL = 60.0
+    _channel_cache = KeyedCache(maxsize=4096, ttl=CACHE_TTL)
+
+    @classmethod
+    def cache(cls, puzzle_data: PuzzleData):
+        """Add or replace the cached puzzle for its channel"""
+        cls._channel_cache.put(puzzle_data.channel_id, puzzle_data)
+
+    @classmethod
+    def uncache(cls, channel_id: int):
+        cls._channel_cache.invalidate(channel_id)
+
+    @classmethod
+    def cache_stats(cls):
+        return cls._channel_cache.stats()
+
     @classmethod
     async def delete(cls, puzzle_data):
         await puzzle_data.update(
             status="deleted", delete_time=datetime.datetime.now(tz=pytz.UTC)
         ).apply()
+        cls.uncache(puzzle_data.channel_id)
+
+    @classmethod
+    async def _delete_where(cls, clause) -> List[int]:
+        """Mark the active puzzles matching clause as deleted with a single UPDATE,
+        and return their channel ids
+        """
+        rows = await PuzzleData.update.values(
+            status="deleted", delete_time=datetime.datetime.now(tz=pytz.UTC)
+        ).where(clause & PuzzleData.delete_time.is_(None)).returning(
+            PuzzleData.channel_id
+        ).gino.all()
+        channel_ids = [channel_id for channel_id, in rows]
+        for channel_id in channel_ids:
+            cls.uncache(channel_id)
+        return channel_ids
+
+    @classmethod
+    async def delete_missing(cls, guild_id: int, channel_ids: List[int]) -> List[int]:
+        """Mark every puzzle in the guild whose channel is not in channel_ids as deleted,
+        and return the channel ids of the puzzles marked deleted
+        """
+        if not channel_ids:
+            # <> ALL of an empty array is true for every row
+            return []
+        return await cls._delete_where(
+            (PuzzleData.guild_id == guild_id)
+            & (
+                PuzzleData.channel_id
+                != db.all_(db.bindparam("channel_ids", channel_ids, type_=db.ARRAY(db.BIGINT)))
+            )
+        )
+
+    @classmethod
+    async def delete_puzzles(cls, guild_id: int, puzzle_ids: List[int]) -> List[int]:
+        """Mark the puzzles with the given ids as deleted, and return their channel ids"""
+        if not puzzle_ids:
+            return []
+        return await cls._delete_where(
+            (PuzzleData.guild_id == guild_id)
+            & (
+                PuzzleData.id
+                == db.any_(db.bindparam("puzzle_ids", puzzle_ids, type_=db.ARRAY(db.BIGINT)))
+            )
+        )
+
+    @classmethod
+    async def delete_channel(cls, guild_id: int, channel_id: int) -> bool:
+        """Mark the puzzle of a deleted channel as deleted, returns whether there was one"""
+        deleted = await cls._delete_where(
+            (PuzzleData.guild_id == guild_id) & (PuzzleData.channel_id == channel_id)
+        )
+        cls.uncache(channel_id)
+        return bool(deleted)
+
+    @classmethod
+    async def update_where(cls, clause, **values) -> List[PuzzleData]:
+        """Update the active puzzles matching clause with a single UPDATE, and return them
+
+        Cached puzzles are replaced by the updated rows.
+        """
+        puzzles = await PuzzleData.update.values(**values).where(
+            clause & PuzzleData.delete_time.is_(None)
+        ).returning(*PuzzleData.__table__.columns).gino.load(PuzzleData).all()
+        for puzzle in puzzles:
+            if puzzle.channel_id in cls._channel_cache:
+                cls.cache(puzzle)
+        return puzzles
 
     @classmethod
     async def request_delete(cls, puzzle_data):
@@ -29,88 +167,166 @@ class PuzzleDb:
 
     @classmethod
     async def get(cls, guild_id, puzzle_id) -> PuzzleData:
+        puzzle = cls._channel_cache.get(puzzle_id)
+        if puzzle is not None and puzzle.guild_id == guild_id:
+            return puzzle
+
         puzzle = await PuzzleData.query.where(
             (PuzzleData.guild_id == guild_id) & (PuzzleData.channel_id == puzzle_id)
         ).gino.first()
         if puzzle is None:
             raise MissingPuzzleError(f"Unable to find puzzle {puzzle_id} for guild {guild_id}")
+        cls.cache(puzzle)
         return puzzle
 
     @classmethod
-    async def get_all(cls, guild_id: int) -> List[PuzzleData]:
-        # TODO: need to also filter on hunt_name
-        puzzle_datas = await PuzzleData.query.where(
-            (PuzzleData.guild_id == guild_id) & (PuzzleData.delete_time.is_(None))
-        ).gino.all()
-        return cls.sort_by_round_start(puzzle_datas)
+    def select_rows(cls, row_type: Type[NamedTuple]):
+        """Query selecting only the columns of row_type, see load_rows"""
+        return db.select([PuzzleData.__table__.c[field] for field in row_type._fields])
+
+    @classmethod
+    async def load_rows(cls, row_type: Type[NamedTuple], query) -> list:
+        return [row_type(*row) for row in await query.gino.all()]
+
+    @classmethod
+    async def get_all(
+        cls,
+        guild_id: int,
+        hunt_id: Optional[int] = None,
+        ordered: bool = False,
+        row_type: Optional[Type[NamedTuple]] = None,
+    ) -> list:
+        """Return the guild's non-deleted puzzles, only those in the hunt if hunt_id is given
+
+        If ordered, puzzles in the same round are grouped together, with rounds
+        sorted by the start time of their first puzzle, and puzzles within a round
+        by start time. If row_type is given, only its columns are loaded.
+        """
+        clause = (PuzzleData.guild_id == guild_id) & (PuzzleData.delete_time.is_(None))
+        if hunt_id is not None:
+            clause = clause & (PuzzleData.hunt_id == hunt_id)
+        if row_type is None:
+            query = PuzzleData.query.where(clause)
+        else:
+            query = cls.select_rows(row_type).where(clause)
+        if ordered:
+            round_start_time = db.func.min(PuzzleData.start_time).over(
+                partition_by=PuzzleData.round_id
+            )
+            query = query.order_by(
+                round_start_time.nullsfirst(),
+                PuzzleData.round_id,
+                PuzzleData.start_time.nullsfirst(),
+                PuzzleData.id,
+            )
+        if row_type is not None:
+            return await cls.load_rows(row_type, query)
+        return await query.gino.all()
+
+    @classmethod
+    def _to_archive_clause(cls, guild_id: int, settings, include_general: bool):
+        """Solved but unarchived puzzles, served by the partial index ix_puzzle_data_to_archive"""
+        clause = (
+            (PuzzleData.guild_id == guild_id)
+            & (PuzzleData.status == "solved")
+            & PuzzleData.archive_time.is_(None)
+            & PuzzleData.delete_time.is_(None)
+        )
+        if not include_general:
+            # we usually do not want to archive general channels, only do manually
+            clause = clause & PuzzleData.name.is_distinct_from(settings.discussion_channel)
+        return clause
+
+    @classmethod
+    def _to_delete_clause(cls, guild_id: int, settings, include_general: bool):
+        """Puzzles requested for deletion, served by the partial index ix_puzzle_data_to_delete"""
+        clause = (
+            (PuzzleData.guild_id == guild_id)
+            & PuzzleData.delete_request.isnot(None)
+            & PuzzleData.solve_time.is_(None)
+            & PuzzleData.archive_time.is_(None)
+            & PuzzleData.delete_time.is_(None)
+        )
+        if not include_general:
+            # we usually do not want to delete general channels, only do manually
+            clause = clause & PuzzleData.name.is_distinct_from(settings.discussion_channel)
+        return clause
 
     @classmethod
     async def get_solved_puzzles_to_archive(
         cls, guild_id, now=None, include_general: bool = False
     ) -> List[PuzzleData]:
         """Returns list of all solved but unarchived puzzles"""
-        all_puzzles = await cls.get_all(guild_id)
         now = now or datetime.datetime.now(tz=pytz.UTC)
-        puzzles_to_archive = []
         settings = await database.query_guild(guild_id)
         delay_in_seconds = settings.archive_delay
-        for puzzle in all_puzzles:
-            if puzzle.archive_time is not None:
-                # already archived
-                continue
-            if puzzle.name == settings.discussion_channel and not include_general:
-                # we usually do not want to archive general channels, only do manually
-                continue
-            if puzzle.is_solved():
-                # found a solved puzzle
-                if now - puzzle.solve_time > datetime.timedelta(seconds=delay_in_seconds):
-                    # enough time has passed, archive the channel
-                    puzzles_to_archive.append(puzzle)
-        return puzzles_to_archive
+        query = PuzzleData.query.where(
+            cls._to_archive_clause(guild_id, settings, include_general)
+            & (PuzzleData.solve_time < now - datetime.timedelta(seconds=delay_in_seconds))
+        )
+        return await query.order_by(PuzzleData.solve_time).gino.all()
 
     @classmethod
     async def get_puzzles_to_delete(
         cls, guild_id: int, include_general: bool = False, minutes: int = 5
-    ) -> List[PuzzleData]:
+    ) -> List[PuzzleDeleteRow]:
         """Return list of puzzles to delete"""
-        all_puzzles = await cls.get_all(guild_id)
+        if minutes is None:
+            minutes = 5  # default to deleting puzzles that were marked 5 minutes ago. Un-hard-code?
         now = datetime.datetime.now(tz=pytz.UTC)
-        puzzles_to_delete = []
         settings = await database.query_guild(guild_id)
-        for puzzle in all_puzzles:
-            if puzzle.solve_time is not None or puzzle.archive_time is not None:
-                # already archived
-                continue
-            if puzzle.name == settings.discussion_channel and not include_general:
-                # we usually do not want to archive general channels, only do manually
-                continue
-            if puzzle.delete_request is not None:
-                # found a puzzle to delete
-                if minutes is None:
-                    minutes = 5  # default to archiving puzzles that have been solved for 5 minutes. Un-hard-code?
-                if now - puzzle.delete_request > datetime.timedelta(minutes=minutes):
-                    # enough time has passed, archive the channel
-                    puzzles_to_delete.append(puzzle)
-        return puzzles_to_delete
-
-    @classmethod
-    def sort_by_round_start(cls, puzzles: list) -> list:
-        """Return list of PuzzleData objects sorted by start of round time
-
-        Groups puzzles in the same round together, and sorts puzzles within round
-        by start_time.
-        """
-        round_start_times = {}
+        query = cls.select_rows(PuzzleDeleteRow).where(
+            cls._to_delete_clause(guild_id, settings, include_general)
+            & (PuzzleData.delete_request < now - datetime.timedelta(minutes=minutes))
+        )
+        return await cls.load_rows(PuzzleDeleteRow, query.order_by(PuzzleData.delete_request))
 
-        for puzzle in puzzles:
-            if puzzle.start_time is None:
-                continue
+    @classmethod
+    async def get_next_due_time(cls, guild_id: int) -> Optional[datetime.datetime]:
+        """Return the earliest time at which a puzzle in the guild is due to be archived or deleted"""
+        settings = await database.query_guild(guild_id)
+        first_solve_time = await db.select([db.func.min(PuzzleData.solve_time)]).where(
+            cls._to_archive_clause(guild_id, settings, include_general=False)
+        ).gino.scalar()
+        first_delete_request = await db.select([db.func.min(PuzzleData.delete_request)]).where(
+            cls._to_delete_clause(guild_id, settings, include_general=False)
+        ).gino.scalar()
 
-            start_time = puzzle.start_time.timestamp()  # epoch time
-            round_start_time = round_start_times.get(puzzle.round_name)
-            if round_start_time is None or start_time < round_start_time:
-                round_start_times[puzzle.round_name] = start_time
+        due_times = []
+        if first_solve_time is not None:
+            due_times.append(first_solve_time + datetime.timedelta(seconds=settings.archive_delay))
+        if first_delete_request is not None:
+            due_times.append(first_delete_request + cls.DELETE_DELAY)
+        return min(due_times, default=None)
 
-        return sorted(
-            puzzles, key=lambda p: (round_start_times.get(p.round_name, 0), p.start_time or 0)
-        )
+    @classmethod
+    async def get_hunt_update_times(cls, hunt_ids: List[int]) -> Dict[int, datetime.datetime]:
+        """Return hunt_id -> most recent update_time of any puzzle in the given hunts"""
+        if not hunt_ids:
+            return {}
+        rows = await db.select(
+            [PuzzleData.hunt_id, db.func.max(PuzzleData.update_time)]
+        ).where(PuzzleData.hunt_id.in_(hunt_ids)).group_by(PuzzleData.hunt_id).gino.all()
+        return {hunt_id: update_time for hunt_id, update_time in rows}
+
+    @classmethod
+    async def get_puzzles_in_hunt(cls, hunt_id: int) -> List[NexusRow]:
+        """Return all non-deleted puzzles in the hunt, grouped by round"""
+        puzzles_by_hunt = await cls.get_puzzles_in_hunts([hunt_id])
+        return puzzles_by_hunt.get(hunt_id, [])
+
+    @classmethod
+    async def get_puzzles_in_hunts(cls, hunt_ids: List[int]) -> Dict[int, List[NexusRow]]:
+        """Return hunt_id -> non-deleted puzzles in the hunt, loaded with a single query"""
+        if not hunt_ids:
+            return {}
+        # round_id is the category's discord id, so ordering by it groups rounds in creation order
+        query = cls.select_rows(NexusRow).where(
+            PuzzleData.hunt_id.in_(hunt_ids) & PuzzleData.delete_time.is_(None)
+        ).order_by(PuzzleData.round_id, PuzzleData.id)
+        puzzles = await cls.load_rows(NexusRow, query)
+
+        puzzles_by_hunt = {hunt_id: [] for hunt_id in hunt_ids}
+        for puzzle in puzzles:
+            puzzles_by_hunt[puzzle.hunt_id].append(puzzle)
+        return puzzles_by_hunt
@@ -24,8 +24,8 @@ async def shutdown():
 
 
 async def query_guild(guild_id: int):
-    """query guild, create if it does not exist"""
-    return await models.GuildSettings.get_or_create(guild_id)
+    """query guild (cached in-process), create if it does not exist"""
+    return await models.GuildSettings.get_cached(guild_id)
 
 
 async def query_hunt_settings_by_name(guild_id: int, hunt_name: str, allow_create: bool = True):
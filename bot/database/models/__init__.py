@@ -2,3 +2,5 @@ from .guilds import GuildSettings
 from .hunt_settings import HuntSettings
 from .puzzle_data import PuzzleData, PuzzleNotes
 from .round_data import RoundData
+from .job_data import JobData
+from .archive_ledger import ArchiveLedger
@@ -0,0 +1,51 @@
+from typing import Dict, Iterable
+
+from bot.database import db
+
+
+class ArchiveLedger(db.Model):
+    """Progress of copying a source channel into an archive channel
+
+    See ChannelManagement._archive_channels_final
+    """
+
+    __tablename__ = "archive_ledger"
+
+    id = db.Column(db.BIGINT, primary_key=True, autoincrement=True)
+    guild_id = db.Column(db.BIGINT, default=0)
+    source_channel_id = db.Column(db.BIGINT, nullable=False)
+    archive_channel_id = db.Column(db.BIGINT, nullable=False)
+    start_message_id = db.Column(db.BIGINT)  # "ARCHIVE START" message in the archive channel
+    thread_id = db.Column(db.BIGINT)  # Thread off the start message holding the copy, if any
+    last_message_id = db.Column(db.BIGINT)  # Last source message which has been copied
+    message_count = db.Column(db.Integer, default=0)  # Number of source messages copied so far
+    start_time = db.Column(db.DateTime(timezone=True))
+    end_time = db.Column(db.DateTime(timezone=True))  # Set once the whole channel is copied
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            source_channel_id,
+            archive_channel_id,
+            name="uq_archive_ledger_source_channel_id_archive_channel_id",
+        ),
+    )
+
+    @classmethod
+    async def for_archive(
+        cls, archive_channel_id: int, source_channel_ids: Iterable[int]
+    ) -> Dict[int, "ArchiveLedger"]:
+        """Return source_channel_id -> ledger entry for the archive channel"""
+        entries = await cls.query.where(
+            (cls.archive_channel_id == archive_channel_id)
+            & cls.source_channel_id.in_(list(source_channel_ids))
+        ).gino.all()
+        return {entry.source_channel_id: entry for entry in entries}
+
+    @classmethod
+    async def has_entries(cls, archive_channel_id: int) -> bool:
+        return await db.scalar(
+            db.exists().where(cls.archive_channel_id == archive_channel_id).select()
+        )
+
+    def is_complete(self) -> bool:
+        return self.end_time is not None
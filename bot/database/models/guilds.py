@@ -1,7 +1,9 @@
 import textwrap
-from typing import Dict
+from typing import Dict, Iterable
 
 from bot.database import db
+from bot.database.upsert import get_or_insert
+from bot.utils.cache import KeyedCache
 
 
 class GuildSettings(db.Model):
@@ -26,14 +28,40 @@ class GuildSettings(db.Model):
     archive_delay = db.Column(db.Integer, default=300)  # Delay for items to be archived, in seconds
     sticky_first_message = db.Column(db.BIGINT, default=False)  # Whether to pin the first message and edit it when sheet is created
 
+    # Write-through cache of guild_id -> GuildSettings, see get_cached()
+    _cache = KeyedCache()
+
     @classmethod
     async def get_or_create(cls, guild_id: int) -> "GuildSettings":
         """query guild, create if it does not exist"""
-        guild = await cls.get(guild_id)
+        return await get_or_insert(cls, ["id"], id=guild_id)
+
+    @classmethod
+    async def get_cached(cls, guild_id: int) -> "GuildSettings":
+        """query guild from the in-process cache, falling back to the database
+
+        The cached instance is shared between callers, so updates applied via
+        ``settings.update(...).apply()`` are reflected in the cache as well.
+        """
+        guild = cls._cache.get(guild_id)
         if guild is None:
-            guild = await cls.create(id=guild_id)
+            guild = await cls.get_or_create(guild_id)
+            cls._cache.put(guild_id, guild)
         return guild
 
+    @classmethod
+    def prime_cache(cls, guilds: Iterable["GuildSettings"]):
+        for guild in guilds:
+            cls._cache.put(guild.id, guild)
+
+    @classmethod
+    def invalidate_cache(cls, guild_id: int):
+        cls._cache.invalidate(guild_id)
+
+    @classmethod
+    def cache_stats(cls) -> Dict[str, int]:
+        return cls._cache.stats()
+
     @classmethod
     def column_type(cls, column_name):
         return getattr(cls, column_name).type.python_type
@@ -42,7 +70,13 @@ class GuildSettings(db.Model):
         for key in values:
             if self.column_type(key) == int:
                 values[key] = int(values[key])
-        await self.update(**values).apply()
+        try:
+            await self.update(**values).apply()
+        except Exception:
+            # update() has already modified this instance in-memory
+            self.invalidate_cache(self.id)
+            raise
+        self._cache.put(self.id, self)
 
     def to_json(self):
         # TODO: use json.dumps() & mapper.attrs
@@ -5,6 +5,7 @@ from typing import Dict, List
 import pytz
 
 from bot.database import db
+from bot.database.upsert import get_or_insert
 
 
 class HuntSettings(db.Model):
@@ -35,17 +36,13 @@ class HuntSettings(db.Model):
     @classmethod
     async def get_or_create_by_name(cls, guild_id: int, hunt_name: str):
         """query hunt settings, create if it does not exist"""
-        settings = await cls.query.where(
-            (cls.guild_id == guild_id) & (cls.hunt_name == hunt_name)
-        ).gino.first()
-        if settings is None:
-            start_time = datetime.datetime.now(tz=pytz.UTC)
-            settings = await cls.create(
-                guild_id=guild_id,
-                hunt_name=hunt_name,
-                start_time=start_time,
-            )
-        return settings
+        return await get_or_insert(
+            cls,
+            ["guild_id", "hunt_name"],
+            guild_id=guild_id,
+            hunt_name=hunt_name,
+            start_time=datetime.datetime.now(tz=pytz.UTC),
+        )
 
     @classmethod
     async def get_active_hunts(cls, guild_id: int) -> List["HuntSettings"]:
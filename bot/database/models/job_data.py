@@ -0,0 +1,39 @@
+from bot.database import db
+
+
+class JobData(db.Model):
+    """Background job, e.g. Google Drive work done outside of slash commands
+
+    See bot.data.job_queue.JobQueue
+    """
+
+    __tablename__ = "job_data"
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    id = db.Column(db.BIGINT, primary_key=True, autoincrement=True)
+    guild_id = db.Column(db.BIGINT, default=0)
+    kind = db.Column(db.Text, nullable=False)  # Name of the handler registered with the JobQueue
+    payload = db.Column(db.JSON, nullable=False, server_default="{}")
+    status = db.Column(db.Text, nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_time = db.Column(
+        db.DateTime(timezone=True), nullable=False, server_default=db.func.now()
+    )  # Earliest time to (re)try the job
+    last_error = db.Column(db.Text)
+    create_time = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    update_time = db.Column(
+        db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now()
+    )
+
+    __table_args__ = (
+        # Only pending jobs are ever polled
+        db.Index(
+            "ix_job_data_pending",
+            run_time,
+            postgresql_where=(status == PENDING),
+        ),
+    )
@@ -4,6 +4,7 @@ from typing import List
 import pytz
 
 from bot.database import db
+from bot.database.upsert import get_or_insert
 
 
 class PuzzleData(db.Model):
@@ -26,6 +27,8 @@ class PuzzleData(db.Model):
     guild_id = db.Column(db.BIGINT, default=0)
     guild_name = db.Column(db.Text)
     ###
+    # Denormalized from round_data.hunt_id, so hunt-scoped queries need not join rounds
+    hunt_id = db.Column(db.BIGINT, nullable=True)
 
     channel_id = db.Column(db.BIGINT, default=0)
     channel_mention = db.Column(db.Text)
@@ -43,6 +46,34 @@ class PuzzleData(db.Model):
     archive_time = db.Column(db.DateTime(timezone=True))
     delete_request = db.Column(db.DateTime(timezone=True))
     delete_time = db.Column(db.DateTime(timezone=True))
+    update_time = db.Column(
+        db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now()
+    )  # Bumped on every update, used to skip refreshing unchanged nexus sheets
+
+    __table_args__ = (
+        db.UniqueConstraint(guild_id, channel_id, name="uq_puzzle_data_guild_id_channel_id"),
+        db.Index("ix_puzzle_data_guild_id_hunt_id_delete_time", guild_id, hunt_id, delete_time),
+        # For the nexus refresh loop's most recent update_time per hunt, see PuzzleDb
+        db.Index("ix_puzzle_data_hunt_id_update_time", hunt_id, update_time),
+        # Partial indexes for the archive/delete loop, see PuzzleDb
+        db.Index(
+            "ix_puzzle_data_to_archive",
+            guild_id,
+            solve_time,
+            postgresql_where=(status == "solved")
+            & archive_time.is_(None)
+            & delete_time.is_(None),
+        ),
+        db.Index(
+            "ix_puzzle_data_to_delete",
+            guild_id,
+            delete_request,
+            postgresql_where=delete_request.isnot(None)
+            & solve_time.is_(None)
+            & archive_time.is_(None)
+            & delete_time.is_(None),
+        ),
+    )
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -52,12 +83,9 @@ class PuzzleData(db.Model):
     @classmethod
     async def get_or_create(cls, guild_id: int, channel_id: int, **kwargs) -> "PuzzleData":
         """query puzzle data, create if it does not exist"""
-        puzzle = await cls.query.where(
-            (cls.guild_id == guild_id) & (cls.channel_id == channel_id)
-        ).gino.first()
-        if puzzle is None:
-            puzzle = await cls.create(guild_id=guild_id, channel_id=channel_id, **kwargs)
-        return puzzle
+        return await get_or_insert(
+            cls, ["guild_id", "channel_id"], guild_id=guild_id, channel_id=channel_id, **kwargs
+        )
 
     @classmethod
     async def puzzles_in_round(cls, round_id: int) -> List["PuzzleData"]:
@@ -1,5 +1,7 @@
 from bot.database import db
+from bot.database.upsert import get_or_insert
 from bot.database.models.hunt_settings import HuntSettings, HuntNotFoundError
+from bot.database.models.puzzle_data import PuzzleData
 
 from typing import Optional
 
@@ -18,15 +20,20 @@ class RoundData(db.Model):
     solved_category_id = db.Column(db.BIGINT, default=0)
     round_url = db.Column(db.Text)  # if there is a separate url scheme for round
     round_url_sep = db.Column(db.Text)  # if there is a different separater for round
+    drive_folder_id = db.Column(db.Text)  # ID of the round's Google Drive folder, once created
 
     __table_args__ = (db.UniqueConstraint(hunt_id, name, name="uq_round_data_hunt_id_name"),)
 
     @classmethod
     async def get_or_create(cls, category: int, **kwargs) -> "RoundData":
-        """query round data, create if it does not exist"""
+        """query round data, create if it does not exist
+
+        category may also be the round's solved category, so look the round up
+        first. Creating it is atomic, in case of concurrent /round commands.
+        """
         round_data = await cls.query_by_category(category)
         if round_data is None:
-            round_data = await RoundData.create(category_id=category, **kwargs)
+            round_data = await get_or_insert(cls, ["category_id"], category_id=category, **kwargs)
         return round_data
 
     @classmethod
@@ -39,7 +46,7 @@ class RoundData(db.Model):
         if hunt is None:
             hunt = await HuntSettings.create()
             # Also update the round
-            await round_data.update(hunt_id=hunt.id).apply()
+            await round_data.set_hunt(hunt.id)
         return hunt
 
     @classmethod
@@ -47,6 +54,14 @@ class RoundData(db.Model):
         rounds = await cls.query.where((cls.hunt_id == hunt.id)).gino.all()
         return rounds
 
+    async def set_hunt(self, hunt_id: int):
+        """Move the round to another hunt, along with its puzzles' denormalized hunt_id"""
+        async with db.transaction():
+            await self.update(hunt_id=hunt_id).apply()
+            await PuzzleData.update.values(hunt_id=hunt_id).where(
+                PuzzleData.round_id == self.category_id
+            ).gino.status()
+
     async def hunt_name(self):
         hunt = await HuntSettings.get(self.hunt_id)
         return hunt.hunt_name
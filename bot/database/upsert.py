@@ -0,0 +1,25 @@
+"""
+Atomic get-or-create for the models' get_or_create methods
+"""
+from typing import List, Type
+
+from sqlalchemy.dialects.postgresql import insert
+
+from bot.database import db
+
+
+async def get_or_insert(model: Type[db.Model], conflict_columns: List[str], **values):
+    """Insert a row, or return the existing row with the same conflict_columns
+
+    Runs a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING, so concurrent
+    callers get the same row instead of creating duplicates. conflict_columns
+    must match a unique constraint or index. The update only reassigns the first
+    conflict column to its own value, so an existing row is returned unchanged.
+    """
+    table = model.__table__
+    statement = insert(table).values(**values)
+    key = conflict_columns[0]
+    statement = statement.on_conflict_do_update(
+        index_elements=conflict_columns, set_={key: statement.excluded[key]}
+    ).returning(*table.columns)
+    return await statement.gino.load(model).first()
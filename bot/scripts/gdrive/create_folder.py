@@ -6,7 +6,7 @@ python -m bot.scripts.gdrive.create_folder --name [..] --parent [ID]
 """
 import asyncio
 
-from bot.utils.gdrive import get_or_create_folder
+from bot.utils.gdrive import drive, get_or_create_folder
 
 if __name__ == "__main__":
     # Find or create a new folder
@@ -19,5 +19,11 @@ if __name__ == "__main__":
     )
     args = parser.parse_args()
 
-    result = asyncio.run(get_or_create_folder(args.name, args.parent), debug=True)
+    async def main():
+        try:
+            return await get_or_create_folder(args.name, args.parent)
+        finally:
+            await drive.close()
+
+    result = asyncio.run(main(), debug=True)
     print(result)
@@ -6,7 +6,7 @@ python -m bot.scripts.gdrive.rename_file --id [ID] --name [..]
 """
 import asyncio
 
-from bot.utils.gdrive import rename_file
+from bot.utils.gdrive import drive, rename_file
 
 if __name__ == "__main__":
     # Find or create a new folder
@@ -17,5 +17,11 @@ if __name__ == "__main__":
     parser.add_argument("--name", required=True, help="New name of file")
     args = parser.parse_args()
 
-    result = asyncio.run(rename_file(args.id, lambda x: args.name), debug=True)
+    async def main():
+        try:
+            return await rename_file(args.id, lambda x: args.name)
+        finally:
+            await drive.close()
+
+    result = asyncio.run(main(), debug=True)
     print(result)
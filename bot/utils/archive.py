@@ -0,0 +1,203 @@
+"""
+Packing of puzzle channel messages into archive channel posts
+"""
+import datetime
+import re
+import time
+from typing import Any, List, Optional, Tuple
+
+import discord
+
+# Discord limits per message
+MAX_CONTENT_LENGTH = 2000
+MAX_FILES = 10
+
+
+def message_header(author_name: Optional[str], created_at: datetime.datetime) -> str:
+    """Header for a copied message; the author is omitted for webhook posts made as the author"""
+    timestamp = f"[{created_at.strftime('%Y-%m-%d %H:%M')}]:\n"
+    if author_name is None:
+        return timestamp
+    return f"**{author_name}** {timestamp}"
+
+
+class ArchivePost:
+    """Contents of one archive post, and the source messages it covers"""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.attachments: List[Any] = []
+        self.last_message_id: Optional[int] = None
+        self.message_count = 0  # Number of source messages, including ones without content
+        self.author: Optional[Any] = None  # Author of the messages, if packed by author
+        self.sources: List[Any] = []  # Source messages whose text is in the post
+
+    @property
+    def content(self) -> str:
+        return "\n".join(self.parts)
+
+    def is_empty(self) -> bool:
+        return not self.parts and not self.attachments
+
+    def fits(
+        self, text: str, attachments: list, max_messages: Optional[int], author: Any = None
+    ) -> bool:
+        if self.is_empty():
+            return True
+        if max_messages is not None and len(self.parts) >= max_messages:
+            return False
+        if author is not None and author != self.author:
+            return False
+        length = len(self.content) + len(text) + (1 if self.parts and text else 0)
+        return length <= MAX_CONTENT_LENGTH and len(self.attachments) + len(attachments) <= MAX_FILES
+
+
+class MessagePacker:
+    """Greedily packs consecutive messages into as few archive posts as possible
+
+    Each message's text goes into a single post, truncated to the Discord
+    limit, and its attachments are split across posts if there are too many.
+    With max_messages=1, every message gets its own post. If messages are
+    added with an author, only messages by the same author share a post.
+    """
+
+    def __init__(self, max_messages: Optional[int] = None):
+        self.max_messages = max_messages
+        self.current = ArchivePost()
+
+    def add(
+        self,
+        message_id: int,
+        text: str,
+        attachments: Optional[list] = None,
+        author: Any = None,
+        source: Any = None,
+    ) -> List[ArchivePost]:
+        """Add a message, and return any posts which are now full
+
+        source (e.g. the discord message) is kept in the post holding the message's text.
+        """
+        attachments = list(attachments or [])
+        text = text[:MAX_CONTENT_LENGTH]
+        posts = []
+        if text or attachments:
+            if not self.current.fits(text, attachments[:MAX_FILES], self.max_messages, author):
+                posts.append(self._take())
+            self.current.author = author
+            if text:
+                self.current.parts.append(text)
+                if source is not None:
+                    self.current.sources.append(source)
+            while len(self.current.attachments) + len(attachments) > MAX_FILES:
+                room = MAX_FILES - len(self.current.attachments)
+                self.current.attachments.extend(attachments[:room])
+                attachments = attachments[room:]
+                posts.append(self._take())
+                self.current.author = author
+            self.current.attachments.extend(attachments)
+        self.current.last_message_id = message_id
+        self.current.message_count += 1
+        return posts
+
+    def flush(self) -> List[ArchivePost]:
+        """Return the remaining partially filled post, if any messages are left"""
+        if self.current.message_count == 0:
+            return []
+        return [self._take()]
+
+    def _take(self) -> ArchivePost:
+        post = self.current
+        self.current = ArchivePost()
+        return post
+
+
+ARCHIVE_START_MARKER = "--- 📂 **ARCHIVE START** ---"
+
+
+def parse_archive_start(content: str) -> Optional[Tuple[int, int]]:
+    """Return (source channel id, message count) of an ARCHIVE START sentinel, if it is one
+
+    The count is 0 if the sentinel does not give one, e.g. "(in progress)".
+    """
+    if ARCHIVE_START_MARKER not in content:
+        return None
+    # The last match, as the category name precedes the channel id
+    ids = re.findall(r"\bid=(\d+)\)", content)
+    if not ids:
+        return None
+    count = re.search(r"\*\*Message Count:\*\* (\d+)", content)
+    return int(ids[-1]), int(count.group(1)) if count else 0
+
+
+def webhook_username(name: str) -> str:
+    """Display name usable for a webhook post, which Discord limits to 80 characters
+    and which may not contain "discord" or "clyde"
+    """
+    name = re.sub(
+        "(d)(iscord)|(c)(lyde)",
+        lambda match: "\u200b".join(group for group in match.groups() if group),
+        name,
+        flags=re.IGNORECASE,
+    )
+    return name[:80] or "unknown"
+
+
+class ArchiveTarget:
+    """Where archive posts are sent: the archive channel or one of its threads,
+    optionally through a webhook which posts as the original author
+    """
+
+    def __init__(self, channel, webhook: Optional[discord.Webhook] = None):
+        self.channel = channel
+        self.thread: Optional[discord.Thread] = None
+        self.webhook = webhook
+
+    @property
+    def destination(self):
+        return self.thread or self.channel
+
+    async def send_post(
+        self, post: ArchivePost, files: List[discord.File], links: Optional[List[str]] = None
+    ) -> discord.Message:
+        """Send the post, with links posted in place of some of its attachments"""
+        content = "\n".join([post.content] + (links or [])).strip()[:MAX_CONTENT_LENGTH]
+        if self.webhook is None or post.author is None:
+            return await self.destination.send(content=content or None, files=files)
+        return await self.webhook.send(
+            content=content or discord.utils.MISSING,
+            files=files,
+            username=webhook_username(post.author.display_name),
+            avatar_url=post.author.display_avatar.url,
+            thread=self.thread or discord.utils.MISSING,
+            wait=True,
+        )
+
+
+class ArchiveProgress:
+    """Counts for the status message of an archive run"""
+
+    # Minimum time between status message edits, in seconds
+    REPORT_INTERVAL = 10.0
+
+    def __init__(self, total_channels: int):
+        self.total_channels = total_channels
+        self.done_channels = 0
+        self.messages = 0
+        self.active = set()
+        self._last_report = 0.0
+
+    def text(self) -> str:
+        active = ", ".join(f"#{name}" for name in sorted(self.active))
+        return (
+            f"Archived {self.done_channels}/{self.total_channels} channels, "
+            f"{self.messages} messages copied"
+            + (f". In progress: {active}" if active else "")
+        )
+
+    def should_report(self) -> bool:
+        """Returns True at most once per REPORT_INTERVAL"""
+        now = time.monotonic()
+        if now - self._last_report < self.REPORT_INTERVAL:
+            return False
+        self._last_report = now
+        return True
@@ -0,0 +1,121 @@
+"""
+Full-text search over archived puzzle channel messages
+
+Messages are added to a local SQLite FTS5 index as they are archived or
+exported, keyed by the source message id so that re-archiving a channel
+does not add duplicates. SQLite calls run on a single worker thread, so
+they do not block the event loop.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+from pathlib import Path
+import sqlite3
+from typing import Iterable, List, NamedTuple, Optional
+
+ARCHIVE_INDEX_PATH = Path("archive_index.sqlite3")
+
+
+class IndexedMessage(NamedTuple):
+    message_id: int
+    guild_id: int
+    channel_id: int
+    channel_name: str
+    puzzle_name: str
+    hunt_name: str
+    author: str
+    created_at: datetime.datetime
+    content: str
+    jump_url: str
+
+
+class SearchResult(NamedTuple):
+    channel_name: str
+    puzzle_name: str
+    hunt_name: str
+    author: str
+    created_at: str
+    snippet: str
+    jump_url: str
+
+
+def match_expression(query: str) -> str:
+    """Quote each word of the query, so that FTS5 query syntax is taken literally"""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+
+class ArchiveIndex:
+    SCHEMA = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5("
+        "content, author, channel_name, puzzle_name, hunt_name, "
+        "guild_id UNINDEXED, channel_id UNINDEXED, created_at UNINDEXED, jump_url UNINDEXED, "
+        "tokenize='porter unicode61')"
+    )
+
+    def __init__(self, path: Path = ARCHIVE_INDEX_PATH):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive-index")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(self.SCHEMA)
+        return self._connection
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _add(self, messages: List[IndexedMessage]):
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO messages(rowid, content, author, channel_name, "
+                "puzzle_name, hunt_name, guild_id, channel_id, created_at, jump_url) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        message.message_id,
+                        message.content,
+                        message.author,
+                        message.channel_name,
+                        message.puzzle_name,
+                        message.hunt_name,
+                        message.guild_id,
+                        message.channel_id,
+                        message.created_at.isoformat(),
+                        message.jump_url,
+                    )
+                    for message in messages
+                ],
+            )
+
+    async def add(self, messages: Iterable[IndexedMessage]):
+        messages = [message for message in messages if message.content]
+        if messages:
+            await self._run(self._add, messages)
+
+    def _search(self, guild_id: int, query: str, limit: int) -> List[SearchResult]:
+        rows = self._connect().execute(
+            "SELECT channel_name, puzzle_name, hunt_name, author, created_at, "
+            "snippet(messages, 0, '**', '**', '…', 16), jump_url "
+            "FROM messages WHERE messages MATCH ? AND guild_id = ? ORDER BY rank LIMIT ?",
+            (match_expression(query), guild_id, limit),
+        ).fetchall()
+        return [SearchResult(*row) for row in rows]
+
+    async def search(self, guild_id: int, query: str, limit: int = 10) -> List[SearchResult]:
+        if not query.split():
+            return []
+        return await self._run(self._search, guild_id, query, limit)
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def close(self):
+        await self._run(self._close)
+
+
+archive_index = ArchiveIndex()
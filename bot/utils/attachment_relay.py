@@ -0,0 +1,166 @@
+"""
+Relaying of attachments from puzzle channels into archive posts
+
+Attachments are downloaded concurrently (up to a limit) through spooled
+temporary files, so that only small files are held in memory. Files which
+were already relayed in this run are replaced by a link to the earlier copy,
+and files too large to upload by a link to the original.
+"""
+import asyncio
+import hashlib
+import logging
+import tempfile
+from typing import Dict, List, Optional
+
+import aiohttp
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class RelayedAttachment:
+    """An attachment to upload, or a link to post in its place"""
+
+    def __init__(self, filename: str, spoiler: bool = False):
+        self.filename = filename
+        self.spoiler = spoiler
+        self.file: Optional[tempfile.SpooledTemporaryFile] = None
+        self.size = 0
+        self.digest: Optional[str] = None
+        self.link: Optional[str] = None
+
+    def to_file(self) -> discord.File:
+        # SpooledTemporaryFile is only an io.IOBase from Python 3.11 on, so pass
+        # discord.File the underlying file: a BytesIO, or a temporary file on disk
+        # once rolled over
+        fp = getattr(self.file, "_file", self.file)
+        fp.seek(0)
+        return discord.File(fp, filename=self.filename, spoiler=self.spoiler)
+
+    def link_text(self) -> str:
+        return f"📎 {self.filename}: {self.link}"
+
+
+class AttachmentRelay:
+    """Downloads attachments for an archive run, with per-run memory accounting
+
+    Use as ``async with AttachmentRelay() as relay``.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    # Files up to this size are kept in memory, larger ones are spooled to disk
+    SPOOL_SIZE = 1024 * 1024
+
+    def __init__(self, max_downloads: int = 4):
+        self.semaphore = asyncio.Semaphore(max_downloads)
+        self.session: Optional[aiohttp.ClientSession] = None
+        # sha256 -> jump url of the archive post where the file was relayed
+        self.relayed: Dict[str, str] = {}
+        self.memory_bytes = 0
+        self.peak_memory_bytes = 0
+        self.downloaded_bytes = 0
+        self.counts = {"uploaded": 0, "deduplicated": 0, "oversized": 0, "failed": 0}
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def fetch_all(self, attachments: list, size_limit: int) -> List[RelayedAttachment]:
+        """Download the attachments of a post, whose uploads may total at most size_limit bytes"""
+        # Oversized files are never downloaded
+        relayed: List[Optional[RelayedAttachment]] = [None] * len(attachments)
+        downloads = []
+        for index, attachment in enumerate(attachments):
+            if attachment.size > size_limit:
+                relayed[index] = self._link(attachment, attachment.url, "oversized")
+            else:
+                downloads.append((index, attachment))
+        results = await asyncio.gather(
+            *[self._download(attachment) for _, attachment in downloads], return_exceptions=True
+        )
+
+        total_size = 0
+        for (index, attachment), result in zip(downloads, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Unable to download attachment {attachment.url}: {result!r}")
+                relayed[index] = self._link(attachment, attachment.url, "failed")
+            elif result.digest in self.relayed:
+                self._release(result)
+                relayed[index] = self._link(attachment, self.relayed[result.digest], "deduplicated")
+            elif total_size + result.size > size_limit:
+                self._release(result)
+                relayed[index] = self._link(attachment, attachment.url, "oversized")
+            else:
+                total_size += result.size
+                relayed[index] = result
+        return relayed
+
+    def uploads(self, relayed: List[RelayedAttachment]) -> List[discord.File]:
+        return [item.to_file() for item in relayed if item.file is not None]
+
+    def links(self, relayed: List[RelayedAttachment]) -> List[str]:
+        return [item.link_text() for item in relayed if item.link is not None]
+
+    def finish(self, relayed: List[RelayedAttachment], message: Optional[discord.Message]):
+        """Remember the files uploaded in message, and free their temporary files"""
+        for item in relayed:
+            if item.file is None:
+                continue
+            if message is not None:
+                self.relayed.setdefault(item.digest, message.jump_url)
+                self.counts["uploaded"] += 1
+            self._release(item)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(
+            self.counts,
+            downloaded_bytes=self.downloaded_bytes,
+            peak_memory_bytes=self.peak_memory_bytes,
+        )
+
+    def _link(self, attachment, link: str, reason: str) -> RelayedAttachment:
+        self.counts[reason] += 1
+        item = RelayedAttachment(attachment.filename)
+        item.link = link
+        return item
+
+    async def _download(self, attachment) -> RelayedAttachment:
+        item = RelayedAttachment(attachment.filename, spoiler=attachment.is_spoiler())
+        digest = hashlib.sha256()
+        item.file = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_SIZE)
+        try:
+            async with self.semaphore:
+                async with self.session.get(attachment.url) as response:
+                    response.raise_for_status()
+                    async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                        digest.update(chunk)
+                        item.file.write(chunk)
+                        self._account(item, len(chunk))
+        except BaseException:
+            self._release(item)
+            raise
+        item.digest = digest.hexdigest()
+        self.downloaded_bytes += item.size
+        return item
+
+    def _account(self, item: RelayedAttachment, size: int):
+        """Track the bytes held in memory, until a spooled file rolls over to disk"""
+        in_memory = item.size <= self.SPOOL_SIZE
+        item.size += size
+        if in_memory:
+            if item.size <= self.SPOOL_SIZE:
+                self.memory_bytes += size
+            else:
+                self.memory_bytes -= item.size - size
+        self.peak_memory_bytes = max(self.peak_memory_bytes, self.memory_bytes)
+
+    def _release(self, item: RelayedAttachment):
+        if item.file is None:
+            return
+        if item.size <= self.SPOOL_SIZE:
+            self.memory_bytes -= item.size
+        item.file.close()
+        item.file = None
@@ -0,0 +1,70 @@
+"""
+Small in-process caches for values which are read on nearly every command
+"""
+from collections import OrderedDict
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class KeyedCache:
+    """Dictionary-backed cache with hit/miss counters
+
+    If ``maxsize`` is given, the least recently used entry is evicted
+    once the cache grows beyond that many entries. If ``ttl`` is given,
+    entries expire that many seconds after they were put.
+    """
+
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        # key -> (value, expiry time or None)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            value, expires = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        if expires is not None and self.clock() >= expires:
+            del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        expires = None if self.ttl is None else self.clock() + self.ttl
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of the cached entries, without counting hits"""
+        return [(key, value) for key, (value, _) in self._entries.items()]
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,135 @@
+"""
+Index of each guild's channels by id and by (category, type, name), to avoid
+scanning guild.channels with discord.utils.get for every lookup.
+
+The index of a guild is built from its channel cache on first use, and kept up
+to date from channel create/update/delete events, see ChannelManagement.
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+# (category id or None, channel type, channel name)
+ChannelKey = Tuple[Optional[int], discord.ChannelType, str]
+
+_ANY = object()
+
+
+class GuildChannelIndex:
+    def __init__(self, channels=()):
+        self.by_id: Dict[int, discord.abc.GuildChannel] = {}
+        # Channel names need not be unique, so each key maps to channels by id
+        self.by_key: Dict[ChannelKey, Dict[int, discord.abc.GuildChannel]] = defaultdict(dict)
+        self.by_type_name: Dict[tuple, Dict[int, discord.abc.GuildChannel]] = defaultdict(dict)
+        # Keys each channel was indexed under. discord.py updates cached channels
+        # in place, so these cannot be recomputed from the channel on update.
+        self._keys: Dict[int, Tuple[ChannelKey, tuple]] = {}
+        for channel in channels:
+            self.add(channel)
+
+    @staticmethod
+    def key(channel) -> ChannelKey:
+        return (channel.category_id, channel.type, channel.name)
+
+    def add(self, channel):
+        self.remove(channel.id)
+        key, type_name = self.key(channel), (channel.type, channel.name)
+        self.by_id[channel.id] = channel
+        self.by_key[key][channel.id] = channel
+        self.by_type_name[type_name][channel.id] = channel
+        self._keys[channel.id] = (key, type_name)
+
+    def remove(self, channel_id: int):
+        self.by_id.pop(channel_id, None)
+        keys = self._keys.pop(channel_id, None)
+        if keys is None:
+            return
+        for index, key in zip((self.by_key, self.by_type_name), keys):
+            channels = index.get(key)
+            if channels is not None:
+                channels.pop(channel_id, None)
+                if not channels:
+                    del index[key]
+
+    def get(self, channel_id: int, type: Optional[discord.ChannelType] = None):
+        channel = self.by_id.get(channel_id)
+        if channel is not None and type is not None and channel.type != type:
+            return None
+        return channel
+
+    def find(self, type: discord.ChannelType, name: str, category_id=_ANY):
+        """Return the channel with the lowest id matching type, name and (if given) category"""
+        if category_id is _ANY:
+            channels = self.by_type_name.get((type, name))
+        else:
+            channels = self.by_key.get((category_id, type, name))
+        if not channels:
+            return None
+        return channels[min(channels)]
+
+
+class ChannelIndex:
+    def __init__(self):
+        self._guilds: Dict[int, GuildChannelIndex] = {}
+
+    def for_guild(self, guild: discord.Guild) -> GuildChannelIndex:
+        index = self._guilds.get(guild.id)
+        if index is None:
+            index = self._guilds[guild.id] = GuildChannelIndex(guild.channels)
+        return index
+
+    def get(
+        self, guild: discord.Guild, channel_id: int, type: Optional[discord.ChannelType] = None
+    ):
+        """Look up a channel by id, like discord.utils.get(guild.channels, id=channel_id, type=type)"""
+        return self.for_guild(guild).get(channel_id, type)
+
+    def get_category(
+        self, guild: discord.Guild, category_id: int
+    ) -> Optional[discord.CategoryChannel]:
+        return self.get(guild, category_id, discord.ChannelType.category)
+
+    def find(self, guild: discord.Guild, type: discord.ChannelType, name: str, category=_ANY):
+        """Look up a channel by type and name, and by category if given (None for no category)"""
+        category_id = category
+        if category is not _ANY and category is not None:
+            category_id = category.id
+        return self.for_guild(guild).find(type, name, category_id)
+
+    def find_category(self, guild: discord.Guild, name: str) -> Optional[discord.CategoryChannel]:
+        return self.find(guild, discord.ChannelType.category, name)
+
+    def add(self, channel):
+        """Add or update a channel, from a create or update event or after creating it"""
+        index = self._guilds.get(channel.guild.id)
+        if index is not None:
+            index.add(channel)
+
+    def remove(self, channel):
+        index = self._guilds.get(channel.guild.id)
+        if index is not None:
+            index.remove(channel.id)
+
+    def forget_guild(self, guild_id: int):
+        self._guilds.pop(guild_id, None)
+
+    def check(self, guild: discord.Guild) -> List[str]:
+        """Compare the index of the guild to its channel cache, and return any differences"""
+        index = self._guilds.get(guild.id)
+        if index is None:
+            return []
+        expected = GuildChannelIndex(guild.channels)
+        errors = []
+        for channel_id in expected.by_id.keys() - index.by_id.keys():
+            errors.append(f"Channel {channel_id} missing from the index")
+        for channel_id in index.by_id.keys() - expected.by_id.keys():
+            errors.append(f"Channel {channel_id} is in the index but no longer exists")
+        for key in expected.by_key.keys() | index.by_key.keys():
+            if expected.by_key.get(key, {}).keys() != index.by_key.get(key, {}).keys():
+                errors.append(f"Channels for {key} differ from the index")
+        return errors
+
+
+channel_index = ChannelIndex()
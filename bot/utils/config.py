@@ -6,6 +6,7 @@ default_config = {
     "prefix": "!",
     "database": "postgresql://localhost/postgres",
     "debug": False,
+    "job_workers": 2,
 }
 
 
@@ -22,6 +23,8 @@ class Config:
         self.token = self.config.get("discord_bot_token", default_config.get("discord_bot_token"))
         self.database = os.getenv("DB_DSN")  # for docker
         self.debug = self.config.get("debug", default_config.get("debug"))
+        # Number of workers draining the background job queue
+        self.job_workers = self.config.get("job_workers", default_config.get("job_workers"))
         if not self.database:
             self.database = self.config.get("database", default_config.get("database"))
 
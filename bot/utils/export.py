@@ -0,0 +1,330 @@
+"""
+Export of puzzle channels to disk, as an alternative to re-posting them into
+an archive channel.
+
+Each channel's history is streamed, one message at a time, into a compressed
+JSONL file and a static HTML transcript. The JSONL file is compressed with
+gzip, or with zstd if the optional zstandard package is installed (it is not
+in the Pipfile). Attachments are downloaded into a
+content-addressed blob directory, so that files posted several times are only
+stored once. Memory use does not depend on the size of the channel. File I/O
+runs in a worker thread, so that exports do not block the event loop.
+
+Layout of the export directory:
+    <export_dir>/blobs/<sha256[:2]>/<sha256><suffix>
+    <export_dir>/channels/<channel name>-<channel id>.jsonl.gz (or .jsonl.zst)
+    <export_dir>/channels/<channel name>-<channel id>.html
+"""
+import asyncio
+import contextlib
+import datetime
+import functools
+import gzip
+import hashlib
+import html
+import io
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+
+try:
+    import zstandard
+except ImportError:  # optional, fall back to gzip
+    zstandard = None
+
+from bot.utils import urls
+from bot.utils.archive_search import ArchiveIndex, IndexedMessage
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = Path("exports")
+
+
+def compression() -> str:
+    """Name of the compression used for exported JSONL files"""
+    return "gzip" if zstandard is None else "zstd"
+
+
+async def _run_in_thread(function, *args):
+    """Run a blocking function in the default executor"""
+    return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+
+def open_compressed(path: Path) -> io.TextIOBase:
+    """Open a text file for writing, compressed with zstd if available and gzip otherwise
+
+    The suffix .zst or .gz is appended to path.
+    """
+    if zstandard is not None:
+        raw = open(path.with_name(path.name + ".zst"), "wb")
+        stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return gzip.open(path.with_name(path.name + ".gz"), "wt", encoding="utf-8")
+
+
+class BufferedFiles:
+    """In-memory buffers for files, whose contents are written out in a worker thread"""
+
+    def __init__(self, *files: io.TextIOBase):
+        self.files = files
+        self.buffers = [io.StringIO() for _ in files]
+
+    def _write(self, chunks: List[str]):
+        for file, chunk in zip(self.files, chunks):
+            if chunk:
+                file.write(chunk)
+
+    async def flush(self):
+        chunks = []
+        for buffer in self.buffers:
+            chunks.append(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+        await _run_in_thread(self._write, chunks)
+
+
+def _isoformat(time: Optional[datetime.datetime]) -> Optional[str]:
+    return time.isoformat() if time else None
+
+
+def message_record(message) -> Dict[str, Any]:
+    """JSON-serializable record of a discord message, without its attachments"""
+    return {
+        "id": message.id,
+        "author": {
+            "id": message.author.id,
+            "name": message.author.name,
+            "display_name": message.author.display_name,
+        },
+        "created_at": _isoformat(message.created_at),
+        "edited_at": _isoformat(message.edited_at),
+        "content": message.content,
+        "reference": message.reference.message_id if message.reference else None,
+        "jump_url": message.jump_url,
+        "attachments": [],
+    }
+
+
+def puzzle_record(puzzle) -> Dict[str, Any]:
+    """Metadata of the puzzle for the transcript header"""
+    if puzzle is None:
+        return {}
+    return {
+        "name": puzzle.name,
+        "round": puzzle.round_name,
+        "status": puzzle.status,
+        "solution": puzzle.solution,
+        "puzzle_url": puzzle.hunt_url,
+        "sheet_url": (
+            urls.spreadsheet_url(puzzle.google_sheet_id) if puzzle.google_sheet_id else None
+        ),
+        "start_time": _isoformat(puzzle.start_time),
+        "solve_time": _isoformat(puzzle.solve_time),
+        "archive_time": _isoformat(puzzle.archive_time),
+    }
+
+
+class BlobStore:
+    """Content-addressed store for attachments, deduplicated by sha256"""
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def blob_path(self, digest: str, suffix: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}{suffix}"
+
+    def _commit(self, tmp_name: str, path: Path):
+        """Move a downloaded file into place, unless the blob is already stored"""
+        if path.exists():
+            os.unlink(tmp_name)
+        else:
+            path.parent.mkdir(exist_ok=True)
+            os.replace(tmp_name, path)
+
+    @staticmethod
+    def _discard(tmp_name: str):
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+
+    async def store(self, session: aiohttp.ClientSession, url: str, filename: str) -> Path:
+        """Download url in chunks into the store, and return the blob path"""
+        digest = hashlib.sha256()
+        fd, tmp_name = await _run_in_thread(
+            functools.partial(tempfile.mkstemp, dir=self.directory, suffix=".part")
+        )
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                        digest.update(chunk)
+                        await _run_in_thread(tmp.write, chunk)
+            path = self.blob_path(digest.hexdigest(), Path(filename).suffix.lower())
+            await _run_in_thread(self._commit, tmp_name, path)
+        except BaseException:
+            await _run_in_thread(self._discard, tmp_name)
+            raise
+        return path
+
+
+class HtmlTranscript:
+    """Static HTML transcript of a channel, written one message at a time"""
+
+    STYLE = (
+        "body { font-family: sans-serif; max-width: 60em; margin: auto; }"
+        " .message { margin: 0.5em 0; } .author { font-weight: bold; }"
+        " .time { color: gray; font-size: small; } .content { white-space: pre-wrap; }"
+        " img { max-width: 40em; display: block; }"
+    )
+    IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+    def __init__(self, file: io.TextIOBase, relative_to: Path):
+        self.file = file
+        self.relative_to = relative_to
+
+    def write_header(self, channel_name: str, puzzle: Dict[str, Any]):
+        title = html.escape(f"#{channel_name}")
+        self.file.write(
+            f"<!DOCTYPE html>\n<html><head><meta charset='utf-8'><title>{title}</title>"
+            f"<style>{self.STYLE}</style></head><body>\n<h1>{title}</h1>\n<table>\n"
+        )
+        for key, value in puzzle.items():
+            if value is None:
+                continue
+            text = html.escape(str(value))
+            if key.endswith("_url"):
+                text = f"<a href='{text}'>{text}</a>"
+            self.file.write(f"<tr><th>{html.escape(key)}</th><td>{text}</td></tr>\n")
+        self.file.write("</table>\n<hr>\n")
+
+    def write_message(self, record: Dict[str, Any]):
+        self.file.write(
+            f"<div class='message' id='m{record['id']}'>"
+            f"<span class='author'>{html.escape(record['author']['display_name'])}</span> "
+            f"<span class='time'>{html.escape(record['created_at'] or '')}</span>"
+            f"<div class='content'>{html.escape(record['content'])}</div>"
+        )
+        for attachment in record["attachments"]:
+            name = html.escape(attachment["filename"])
+            if attachment.get("path"):
+                href = html.escape(os.path.relpath(attachment["path"], self.relative_to))
+            else:
+                href = html.escape(attachment["url"])
+            if Path(attachment["filename"]).suffix.lower() in self.IMAGE_SUFFIXES:
+                self.file.write(f"<a href='{href}'><img src='{href}' alt='{name}'></a>")
+            else:
+                self.file.write(f"<a href='{href}'>{name}</a>")
+        self.file.write("</div>\n")
+
+    def write_footer(self, count: int):
+        self.file.write(f"<hr>\n<p>{count} messages</p>\n</body></html>\n")
+
+
+class ChannelExporter:
+    """Exports channels to JSONL and HTML files under export_dir"""
+
+    # Exported messages are added to the search index in batches of this size
+    INDEX_BATCH_SIZE = 100
+    # Exported messages are buffered, and written out in batches of this size
+    WRITE_BATCH_SIZE = 100
+
+    def __init__(
+        self,
+        export_dir: Path,
+        session: aiohttp.ClientSession,
+        index: Optional[ArchiveIndex] = None,
+    ):
+        self.export_dir = export_dir
+        self.channel_dir = export_dir / "channels"
+        self.channel_dir.mkdir(parents=True, exist_ok=True)
+        self.blobs = BlobStore(export_dir / "blobs")
+        self.session = session
+        self.index = index
+
+    async def records(self, channel) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the channel's messages, oldest first, with attachments stored as blobs"""
+        async for message in channel.history(limit=None, oldest_first=True):
+            record = message_record(message)
+            for attachment in message.attachments:
+                entry = {
+                    "filename": attachment.filename,
+                    "size": attachment.size,
+                    "url": attachment.url,
+                }
+                try:
+                    path = await self.blobs.store(self.session, attachment.url, attachment.filename)
+                    entry["path"] = str(path)
+                    entry["sha256"] = path.stem
+                except Exception:
+                    logger.exception(f"Unable to download {attachment.url} in #{channel.name}")
+                record["attachments"].append(entry)
+            yield record
+
+    def indexed_message(
+        self, channel, record: Dict[str, Any], puzzle_name: str, hunt_name: str
+    ) -> IndexedMessage:
+        return IndexedMessage(
+            message_id=record["id"],
+            guild_id=channel.guild.id,
+            channel_id=channel.id,
+            channel_name=channel.name,
+            puzzle_name=puzzle_name,
+            hunt_name=hunt_name,
+            author=record["author"]["display_name"],
+            created_at=datetime.datetime.fromisoformat(record["created_at"]),
+            content=record["content"],
+            jump_url=record["jump_url"],
+        )
+
+    def _open_files(self, stem: str) -> Tuple[contextlib.ExitStack, io.TextIOBase, io.TextIOBase]:
+        """Open the channel's JSONL and HTML files, closed together by the returned stack"""
+        with contextlib.ExitStack() as stack:
+            jsonl = stack.enter_context(open_compressed(self.channel_dir / f"{stem}.jsonl"))
+            html_file = stack.enter_context(
+                open(self.channel_dir / f"{stem}.html", "w", encoding="utf-8")
+            )
+            return stack.pop_all(), jsonl, html_file
+
+    async def export_channel(self, channel, puzzle=None, hunt_name: str = "") -> int:
+        """Export the channel, and return the number of messages written"""
+        stem = f"{channel.name}-{channel.id}"
+        metadata = puzzle_record(puzzle)
+        puzzle_name = metadata.get("name") or channel.name
+        to_index: List[IndexedMessage] = []
+        count = 0
+        opened, jsonl, html_file = await _run_in_thread(self._open_files, stem)
+        try:
+            # Messages are formatted into in-memory buffers, which are written to
+            # the files in a worker thread every WRITE_BATCH_SIZE messages
+            files = BufferedFiles(jsonl, html_file)
+            jsonl_buffer, html_buffer = files.buffers
+            transcript = HtmlTranscript(html_buffer, relative_to=self.channel_dir)
+            transcript.write_header(channel.name, metadata)
+            header = {"channel": {"id": channel.id, "name": channel.name}, "puzzle": metadata}
+            jsonl_buffer.write(json.dumps(header) + "\n")
+            async for record in self.records(channel):
+                jsonl_buffer.write(json.dumps(record) + "\n")
+                transcript.write_message(record)
+                count += 1
+                if count % self.WRITE_BATCH_SIZE == 0:
+                    await files.flush()
+                if self.index is not None:
+                    to_index.append(self.indexed_message(channel, record, puzzle_name, hunt_name))
+                    if len(to_index) >= self.INDEX_BATCH_SIZE:
+                        await self.index.add(to_index)
+                        to_index = []
+            transcript.write_footer(count)
+            await files.flush()
+        finally:
+            await _run_in_thread(opened.close)
+        if to_index:
+            await self.index.add(to_index)
+        return count
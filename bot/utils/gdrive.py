@@ -3,10 +3,16 @@ aiogoogle utilities for finding and creating folders in Google Drive
 """
 import json
 import logging
+from pathlib import Path
 from typing import Optional
 
 from aiogoogle import Aiogoogle
 from aiogoogle.auth.creds import ServiceAccountCreds
+from aiogoogle.models import Request
+from aiogoogle.resource import GoogleAPI
+from aiogoogle.sessions.aiohttp_session import AiohttpSession
+
+from bot.utils.cache import KeyedCache
 
 # Not sure if this can be consolidated with the gspread_asyncio credentials?
 creds = ServiceAccountCreds(
@@ -15,32 +21,94 @@ creds = ServiceAccountCreds(
 
 logger = logging.getLogger(__name__)
 
+DISCOVERY_CACHE_PATH = Path(".cache", "drive_v3_discovery.json")
+
+
+class DriveClient:
+    """Long-lived Drive v3 client
+
+    Shares one HTTP session across all Drive calls, and keeps the Drive
+    discovery document in memory (and on disk across restarts), instead of
+    re-fetching it before every call.
+    """
+
+    def __init__(self, service_account_creds: ServiceAccountCreds, discovery_cache_path: Path):
+        self.aiogoogle = Aiogoogle(service_account_creds=service_account_creds)
+        self.discovery_cache_path = discovery_cache_path
+        self._session: Optional[AiohttpSession] = None
+        self._drive_v3: Optional[GoogleAPI] = None
+
+    def _use_session(self):
+        # aiogoogle tracks the active session in a context variable, which would
+        # otherwise be a new session per task. Point it at our shared session.
+        if self._session is None or self._session._session.closed:
+            self._session = AiohttpSession()
+        self.aiogoogle.session_context.set(self._session)
+
+    def _load_discovery_document(self) -> Optional[dict]:
+        try:
+            with open(self.discovery_cache_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.exception(f"Unable to read cached discovery document {self.discovery_cache_path}")
+            return None
+
+    def _save_discovery_document(self, discovery_document: dict):
+        try:
+            self.discovery_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.discovery_cache_path, "w") as f:
+                json.dump(discovery_document, f)
+        except OSError:
+            logger.exception(f"Unable to cache discovery document to {self.discovery_cache_path}")
+
+    async def drive_v3(self) -> GoogleAPI:
+        if self._drive_v3 is None:
+            discovery_document = self._load_discovery_document()
+            if discovery_document is not None:
+                self._drive_v3 = GoogleAPI(discovery_document)
+            else:
+                self._use_session()
+                self._drive_v3 = await self.aiogoogle.discover("drive", "v3")
+                self._save_discovery_document(self._drive_v3.discovery_document)
+        return self._drive_v3
+
+    async def call(self, request: Request) -> dict:
+        self._use_session()
+        return await self.aiogoogle.as_service_account(request)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+drive = DriveClient(creds, DISCOVERY_CACHE_PATH)
+
+# (parent_id, name) -> folder_id of folders found or created by get_or_create_folder
+folder_cache = KeyedCache(maxsize=1024)
+
 
 async def create_folder(name: str, parent_id: Optional[str] = None) -> dict:
-    aiogoogle = Aiogoogle(service_account_creds=creds)
-    async with aiogoogle:
-        drive_v3 = await aiogoogle.discover("drive", "v3")
-        payload = {"name": name, "mimeType": "application/vnd.google-apps.folder"}
-        if parent_id:
-            payload["parents"] = [parent_id]
-        result = await aiogoogle.as_service_account(
-            drive_v3.files.create(json=payload, fields="id")
-        )
+    drive_v3 = await drive.drive_v3()
+    payload = {"name": name, "mimeType": "application/vnd.google-apps.folder"}
+    if parent_id:
+        payload["parents"] = [parent_id]
+    result = await drive.call(drive_v3.files.create(json=payload, fields="id"))
     return result  # {"id": ".. folder_id .."}
 
 
 async def find_folder(name: str, parent_id: str) -> dict:
-    aiogoogle = Aiogoogle(service_account_creds=creds)
-    async with aiogoogle:
-        drive_v3 = await aiogoogle.discover("drive", "v3")
-        result = await aiogoogle.as_service_account(
-            drive_v3.files.list(
-                q=f"mimeType='application/vnd.google-apps.folder' "
-                f"and name = '{name}' and parents in '{parent_id}'",
-                spaces="drive",
-                fields="files(id, name)",
-            )
+    drive_v3 = await drive.drive_v3()
+    result = await drive.call(
+        drive_v3.files.list(
+            q=f"mimeType='application/vnd.google-apps.folder' "
+            f"and name = '{name}' and parents in '{parent_id}'",
+            spaces="drive",
+            fields="files(id, name)",
         )
+    )
     return result  # {"files": [{"id": .., "name": ..}]}
 
 
@@ -50,18 +118,30 @@ async def get_or_create_folder(name: str, parent_id: str) -> dict:
     Args:
         parent_id: ID of parent folder in Drive URL
     """
+    folder_id = folder_cache.get((parent_id, name))
+    if folder_id is not None:
+        return {"id": folder_id, "name": name, "created": False}
+
     existing_folder = await find_folder(name, parent_id)
     if existing_folder.get("files"):
         existing_folder = existing_folder["files"][0]
         existing_folder["created"] = False
+        folder_cache.put((parent_id, name), existing_folder["id"])
         return existing_folder
 
     created_folder = await create_folder(name, parent_id)
     created_folder["name"] = name
     created_folder["created"] = True
+    folder_cache.put((parent_id, name), created_folder["id"])
     return created_folder
 
 
+def forget_folder(folder_id: str):
+    """Drop a folder from the cache, e.g. after it was found to be deleted"""
+    for key in [key for key, value in folder_cache.items() if value == folder_id]:
+        folder_cache.invalidate(key)
+
+
 async def rename_file(file_id: str, name_lambda: callable) -> dict:
     """Rename file
 
@@ -70,26 +150,24 @@ async def rename_file(file_id: str, name_lambda: callable) -> dict:
     Args:
         name_lambda: method which takes original name and returns new name
     """
-    aiogoogle = Aiogoogle(service_account_creds=creds)
-    async with aiogoogle:
-        drive_v3 = await aiogoogle.discover("drive", "v3")
-        result = await aiogoogle.as_service_account(
-            drive_v3.files.get(
+    drive_v3 = await drive.drive_v3()
+    result = await drive.call(
+        drive_v3.files.get(
+            fileId=file_id,
+        )
+    )
+    try:
+        name = result["name"]
+    except KeyError:
+        logger.exception(f"Unable to get name field for {file_id} from {result}")
+        raise
+    new_name = name_lambda(name)
+    if name != new_name:
+        payload = {"name": new_name}
+        result = await drive.call(
+            drive_v3.files.update(
+                json=payload,
                 fileId=file_id,
             )
         )
-        try:
-            name = result["name"]
-        except KeyError:
-            logger.exception(f"Unable to get name field for {file_id} from {result}")
-            raise
-        new_name = name_lambda(name)
-        if name != new_name:
-            payload = {"name": new_name}
-            result = await aiogoogle.as_service_account(
-                drive_v3.files.update(
-                    json=payload,
-                    fileId=file_id,
-                )
-            )
     return result  # {"name": .., "id": .., "kind": .., "mimeType": ..}
@@ -3,12 +3,13 @@ Maintain a central "nexus" dashboard with links to puzzles, status, and so forth
 """
 import logging
 import string
-from typing import List
+from typing import List, Optional, Tuple
 
 import gspread_asyncio
+from gspread.utils import rowcol_to_a1
 
 from bot.utils import urls
-from bot.database.models import PuzzleData
+from bot.data.puzzle_db import NexusRow
 
 logger = logging.getLogger(__name__)
 
@@ -28,14 +29,70 @@ COLUMNS = [
     "start_time",
     "solve_time",
 ]
+BLANK_ROW = [""] * len(COLUMNS)
+
+
+def nexus_rows(puzzles: List[NexusRow]) -> List[List[str]]:
+    """Cell values of the nexus sheet, starting with the header row"""
+    rows = [[string.capwords(column.replace("_", " ")) for column in COLUMNS]]
+    for puzzle in puzzles:
+        if puzzle.puzzle_type == "discussion":
+            continue
+        row = []
+        for column in COLUMNS:
+            if column == "google_sheet_url" and puzzle.google_sheet_id:
+                row.append(urls.spreadsheet_url(puzzle.google_sheet_id))
+            else:
+                row.append(str(getattr(puzzle, column, "")))
+        rows.append(row)
+    return rows
+
+
+def changed_row_ranges(
+    old_rows: List[List[str]], new_rows: List[List[str]]
+) -> List[Tuple[int, int]]:
+    """Return [start, end) row index ranges of consecutive rows which differ
+
+    Rows which are no longer present in new_rows are compared against a blank row,
+    so that they get cleared.
+    """
+    ranges = []
+    start = None
+    for i in range(max(len(old_rows), len(new_rows))):
+        old_row = old_rows[i] if i < len(old_rows) else None
+        new_row = new_rows[i] if i < len(new_rows) else BLANK_ROW
+        if old_row != new_row:
+            if start is None:
+                start = i
+        elif start is not None:
+            ranges.append((start, i))
+            start = None
+    if start is not None:
+        ranges.append((start, max(len(old_rows), len(new_rows))))
+    return ranges
 
 
 async def update_nexus(
     agcm: gspread_asyncio.AsyncioGspreadClientManager,
     file_id: str,
-    puzzles: List[PuzzleData],
+    puzzles: List[NexusRow],
     hunt_name: str,
-):
+    previous_rows: Optional[List[List[str]]] = None,
+) -> List[List[str]]:
+    """Write puzzles to the nexus sheet, returning the rows written
+
+    If the rows previously written to this sheet are passed in, only the
+    rows which changed are sent, as one batched update.
+    """
+    rows = nexus_rows(puzzles)
+    if previous_rows is None:
+        ranges = [(0, len(rows))]
+    else:
+        ranges = changed_row_ranges(previous_rows, rows)
+    if not ranges:
+        logger.debug(f"No changes to {hunt_name} nexus spreadsheet")
+        return rows
+
     # Always authorize first.
     # If you have a long-running program call authorize() repeatedly.
     agc = await agcm.authorize()
@@ -46,23 +103,19 @@ async def update_nexus(
     zero_ws = await nexus_sheet.get_worksheet(0)
 
     # Update puzzle contents
-    cell_range = await zero_ws.range(HEADER_ROW, 1, HEADER_ROW + len(puzzles), len(COLUMNS))
-    cell_index = 0
-    update_count = 0
-    for column in COLUMNS:
-        cell_range[cell_index].value = string.capwords(column.replace("_", " "))
-        cell_index += 1
-    for puzzle in puzzles:
-        if puzzle.puzzle_type == "discussion":
-            continue
-        update_count = update_count + 1
-        for column in COLUMNS:
-            if column == "google_sheet_url" and puzzle.google_sheet_id:
-                cell_range[cell_index].value = urls.spreadsheet_url(puzzle.google_sheet_id)
-            else:
-                cell_range[cell_index].value = str(getattr(puzzle, column, ""))
-            cell_index += 1
-    await zero_ws.update_cells(cell_range)
+    data = []
+    for start, end in ranges:
+        first_cell = rowcol_to_a1(HEADER_ROW + start, 1)
+        last_cell = rowcol_to_a1(HEADER_ROW + end - 1, len(COLUMNS))
+        data.append(
+            {
+                "range": f"{first_cell}:{last_cell}",
+                "values": [rows[i] if i < len(rows) else BLANK_ROW for i in range(start, end)],
+            }
+        )
+    await zero_ws.batch_update(data)
     logger.info(
-        f"Finished updating {hunt_name} nexus spreadsheet with {update_count} puzzles"
+        f"Finished updating {hunt_name} nexus spreadsheet with {len(rows) - 1} puzzles, "
+        f"{sum(end - start for start, end in ranges)} rows changed"
     )
+    return rows
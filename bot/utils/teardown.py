@@ -0,0 +1,84 @@
+"""
+Bulk deletion of puzzle channels, for /delete_all
+
+The channels to delete are planned up front and stored in a background job,
+see ChannelManagement.run_delete_channels_job, so that a teardown interrupted
+by a restart resumes with the channels which still exist.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+import discord
+
+
+class TeardownProgress:
+    """Counts for the status message of a teardown"""
+
+    # Minimum time between status message edits, in seconds
+    REPORT_INTERVAL = 5.0
+
+    def __init__(self, total_channels: int):
+        self.total_channels = total_channels
+        self.deleted = 0
+        self.missing = 0  # Already deleted, e.g. before a restart
+        self.failed = 0
+        self._last_report: Optional[float] = None
+
+    @property
+    def done(self) -> int:
+        return self.deleted + self.missing + self.failed
+
+    def text(self) -> str:
+        text = f"Deleted {self.deleted}/{self.total_channels} channels"
+        if self.missing:
+            text += f", {self.missing} already gone"
+        if self.failed:
+            text += f", {self.failed} failed"
+        return text
+
+    def should_report(self, now: Optional[float] = None) -> bool:
+        """Returns True on the first call, then at most once per REPORT_INTERVAL"""
+        if now is None:
+            now = time.monotonic()
+        if self._last_report is not None and now - self._last_report < self.REPORT_INTERVAL:
+            return False
+        self._last_report = now
+        return True
+
+
+async def delete_channels(
+    channels: Iterable[Optional[discord.abc.GuildChannel]],
+    progress: TeardownProgress,
+    concurrency: int,
+    reason: Optional[str] = None,
+    on_progress: Optional[Callable[[TeardownProgress], Awaitable[None]]] = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> List[discord.abc.GuildChannel]:
+    """Delete the channels, at most concurrency at a time, and return the ones that failed
+
+    None entries are channels which no longer exist. discord.py waits out rate
+    limits per route; bounding the concurrency keeps requests from piling up
+    behind the guild-wide limit on channel deletions.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = []
+
+    async def delete(channel):
+        if channel is None:
+            progress.missing += 1
+        else:
+            async with semaphore:
+                try:
+                    await channel.delete(reason=reason)
+                    progress.deleted += 1
+                except discord.NotFound:
+                    progress.missing += 1
+                except discord.HTTPException:
+                    progress.failed += 1
+                    failed.append(channel)
+        if on_progress is not None and progress.should_report(clock()):
+            await on_progress(progress)
+
+    await asyncio.gather(*[delete(channel) for channel in channels])
+    return failed
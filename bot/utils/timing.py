@@ -0,0 +1,32 @@
+"""
+Timing breakdowns for multi-stage operations, for logging
+"""
+import time
+from typing import Awaitable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    """Records how long each named stage of an operation takes
+
+    Stages may run concurrently, e.g. via ``asyncio.gather``.
+    """
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+
+    async def run(self, stage: str, awaitable: Awaitable[T]) -> T:
+        start_time = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.durations[stage] = time.perf_counter() - start_time
+
+    def total(self) -> float:
+        return time.perf_counter() - self.start_time
+
+    def summary(self) -> str:
+        stages = " ".join(f"{stage}={duration:.2f}s" for stage, duration in self.durations.items())
+        return f"{stages} total={self.total():.2f}s"
@@ -0,0 +1,102 @@
+# tests/test_archive.py
+import datetime
+
+from bot.utils.archive import (
+    MAX_CONTENT_LENGTH,
+    MAX_FILES,
+    MessagePacker,
+    message_header,
+    parse_archive_start,
+    webhook_username,
+)
+
+
+class TestMessagePacker:
+    def test_message_header(self):
+        created_at = datetime.datetime(2026, 1, 16, 12, 5)
+        assert message_header("alice", created_at) == "**alice** [2026-01-16 12:05]:\n"
+        assert message_header(None, created_at) == "[2026-01-16 12:05]:\n"
+
+    def test_packs_consecutive_messages(self):
+        """Test that short messages are combined into a single post"""
+        packer = MessagePacker()
+        assert packer.add(1, "first") == []
+        assert packer.add(2, "") == []  # e.g. a message without content
+        assert packer.add(3, "second") == []
+        (post,) = packer.flush()
+        assert post.content == "first\nsecond"
+        assert post.last_message_id == 3
+        assert post.message_count == 3
+        assert packer.flush() == []
+
+    def test_starts_new_post_at_length_limit(self):
+        """Test that posts never exceed the Discord length limit"""
+        packer = MessagePacker()
+        assert packer.add(1, "a" * 1500) == []
+        (post,) = packer.add(2, "b" * 600)
+        assert post.content == "a" * 1500
+        assert post.last_message_id == 1
+        (post,) = packer.add(3, "c" * (MAX_CONTENT_LENGTH + 10))
+        assert post.content == "b" * 600
+        (post,) = packer.flush()
+        assert len(post.content) == MAX_CONTENT_LENGTH
+
+    def test_splits_attachments(self):
+        """Test that attachments are grouped up to the per-message file limit"""
+        packer = MessagePacker()
+        assert packer.add(1, "pics", ["x"] * 4) == []
+        first, second = packer.add(2, "more pics", ["y"] * (MAX_FILES + 2))
+        assert first.content == "pics"
+        assert first.attachments == ["x"] * 4
+        assert second.content == "more pics"
+        assert second.attachments == ["y"] * MAX_FILES
+        # The message is only complete once its last attachments are posted
+        assert second.message_count == 0
+        (post,) = packer.flush()
+        assert post.content == ""
+        assert post.attachments == ["y"] * 2
+        assert post.last_message_id == 2
+        assert post.message_count == 1
+
+    def test_one_message_per_post(self):
+        """Test that max_messages=1 keeps one source message per post"""
+        packer = MessagePacker(max_messages=1)
+        assert packer.add(1, "first") == []
+        (post,) = packer.add(2, "second")
+        assert post.content == "first"
+        (post,) = packer.flush()
+        assert post.content == "second"
+
+    def test_packs_by_author(self):
+        """Test that messages by different authors are not packed into one webhook post"""
+        packer = MessagePacker()
+        assert packer.add(1, "hi", author="alice") == []
+        assert packer.add(2, "there", author="alice") == []
+        (post,) = packer.add(3, "hello", author="bob")
+        assert post.content == "hi\nthere"
+        assert post.author == "alice"
+        (post,) = packer.flush()
+        assert post.author == "bob"
+
+
+class TestWebhookUsername:
+    def test_webhook_username(self):
+        assert webhook_username("alice") == "alice"
+        assert "discord" not in webhook_username("discord fan").lower()
+        assert len(webhook_username("x" * 100)) == 80
+        assert webhook_username("") == "unknown"
+
+
+class TestParseArchiveStart:
+    def test_parse_archive_start(self):
+        """Test that sentinels from old and current archive runs are recognised"""
+        old = (
+            "--- 📂 **ARCHIVE START** ---\n"
+            "**Channel:** #crossword (category=round (id=1) id=1234)\n"
+            "**Message Count:** 56\n"
+            "----------------------------"
+        )
+        assert parse_archive_start(old) == (1234, 56)
+        in_progress = old.replace("56", "(in progress)")
+        assert parse_archive_start(in_progress) == (1234, 0)
+        assert parse_archive_start("**alice** [2026-01-16 12:05]:\nid=5)") is None
@@ -0,0 +1,79 @@
+# tests/test_archive_scheduler.py
+import asyncio
+import datetime
+
+import pytz
+
+from bot.data.archive_scheduler import ArchiveScheduler, DueQueue
+
+
+class TestDueQueue:
+    def test_pop_due_in_time_order(self):
+        """Test that only entries at or before now are popped"""
+        now = datetime.datetime(2026, 1, 16, 12, 0, tzinfo=pytz.UTC)
+        queue = DueQueue()
+        queue.push(now + datetime.timedelta(minutes=5), 1)
+        queue.push(now - datetime.timedelta(minutes=1), 2)
+        queue.push(now, 3)
+        assert queue.peek() == now - datetime.timedelta(minutes=1)
+        assert queue.pop_due(now) == {2, 3}
+        assert len(queue) == 1
+        assert queue.peek() == now + datetime.timedelta(minutes=5)
+
+    def test_pop_due_deduplicates_guilds(self):
+        """Test that a guild scheduled several times is only processed once"""
+        now = datetime.datetime(2026, 1, 16, 12, 0, tzinfo=pytz.UTC)
+        queue = DueQueue()
+        queue.push(now - datetime.timedelta(seconds=2), 1)
+        queue.push(now - datetime.timedelta(seconds=1), 1)
+        assert queue.pop_due(now) == {1}
+        assert queue.peek() is None
+
+
+class TestArchiveScheduler:
+    def test_callback_runs_when_due(self):
+        """Test that the scheduler wakes up for a newly scheduled guild"""
+        processed = []
+
+        async def callback(guild_id):
+            processed.append(guild_id)
+
+        async def run():
+            scheduler = ArchiveScheduler(callback)
+            scheduler.GRACE = datetime.timedelta(0)
+            scheduler.start()
+            scheduler.schedule_in(42, datetime.timedelta(milliseconds=10))
+            await asyncio.sleep(0.2)
+            scheduler.stop()
+
+        asyncio.run(run())
+        assert processed == [42]
+
+    def test_retry_delay_backs_off(self):
+        assert ArchiveScheduler.retry_delay(1) == ArchiveScheduler.RETRY_DELAY
+        assert ArchiveScheduler.retry_delay(2) == 2 * ArchiveScheduler.RETRY_DELAY
+        assert ArchiveScheduler.retry_delay(1000) == ArchiveScheduler.MAX_RETRY_DELAY
+
+    def test_still_due_after_pass_is_retried_later(self):
+        """Test that a guild whose puzzles stay due is not rescheduled in the past"""
+
+        async def callback(guild_id):
+            pass
+
+        async def run():
+            scheduler = ArchiveScheduler(callback)
+            now = datetime.datetime.now(tz=pytz.UTC)
+            past = now - datetime.timedelta(minutes=5)
+            scheduler.schedule_after_pass(1, past)
+            first = scheduler.queue.peek()
+            assert first >= now + ArchiveScheduler.RETRY_DELAY
+            scheduler.schedule_after_pass(1, past)
+            assert scheduler.failures[1] == 2
+            assert scheduler.queue.pop_due(now + 2 * ArchiveScheduler.RETRY_DELAY) == {1}
+            assert scheduler.queue.peek() >= now + 2 * ArchiveScheduler.RETRY_DELAY
+
+            # A future due time resets the backoff
+            scheduler.schedule_after_pass(1, now + datetime.timedelta(minutes=1))
+            assert 1 not in scheduler.failures
+
+        asyncio.run(run())
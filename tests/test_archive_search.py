@@ -0,0 +1,55 @@
+# tests/test_archive_search.py
+import asyncio
+import datetime
+
+import pytz
+
+from bot.utils.archive_search import ArchiveIndex, IndexedMessage, match_expression
+
+
+def make_message(message_id, content, guild_id=1):
+    return IndexedMessage(
+        message_id=message_id,
+        guild_id=guild_id,
+        channel_id=10,
+        channel_name="dots-and-dashes",
+        puzzle_name="dots-and-dashes",
+        hunt_name="mystery-hunt",
+        author="alice",
+        created_at=datetime.datetime(2026, 1, 16, 12, 5, tzinfo=pytz.UTC),
+        content=content,
+        jump_url=f"https://discord.com/channels/{guild_id}/20/{message_id}",
+    )
+
+
+class TestArchiveIndex:
+    def test_match_expression(self):
+        assert match_expression('braille "grid') == '"braille" """grid"'
+
+    def test_search(self, tmp_path):
+        """Test that messages are found by word, per guild, without duplicates"""
+
+        async def run():
+            index = ArchiveIndex(tmp_path / "index.sqlite3")
+            await index.add(
+                [
+                    make_message(1, "the braille grid spells CAT"),
+                    make_message(2, "semaphore flags"),
+                    make_message(3, "braille again", guild_id=2),
+                    make_message(4, ""),
+                ]
+            )
+            # Archiving a channel again replaces its messages
+            await index.add([make_message(1, "the braille grid spells DOG")])
+            results = await index.search(1, "braille")
+            empty = await index.search(1, "  ")
+            await index.close()
+            return results, empty
+
+        results, empty = asyncio.run(run())
+        assert len(results) == 1
+        assert "**braille**" in results[0].snippet
+        assert "DOG" in results[0].snippet
+        assert results[0].jump_url == "https://discord.com/channels/1/20/1"
+        assert results[0].hunt_name == "mystery-hunt"
+        assert empty == []
@@ -0,0 +1,81 @@
+# tests/test_attachment_relay.py
+import asyncio
+import io
+import tempfile
+from types import SimpleNamespace
+
+from bot.utils.attachment_relay import AttachmentRelay, RelayedAttachment
+
+
+def make_attachment(filename, size):
+    return SimpleNamespace(
+        filename=filename, size=size, url=f"https://cdn.example.com/{filename}",
+        is_spoiler=lambda: False,
+    )
+
+
+class TestAttachmentRelay:
+    def test_memory_accounting(self):
+        """Test that only files small enough to stay in memory are counted"""
+        relay = AttachmentRelay()
+        small = RelayedAttachment("small.png")
+        small.file = io.BytesIO()
+        relay._account(small, 1000)
+        assert relay.memory_bytes == 1000
+
+        large = RelayedAttachment("large.png")
+        large.file = io.BytesIO()
+        relay._account(large, relay.SPOOL_SIZE)
+        assert relay.memory_bytes == 1000 + relay.SPOOL_SIZE
+        relay._account(large, 1)  # rolled over to disk
+        assert relay.memory_bytes == 1000
+        assert relay.peak_memory_bytes == 1000 + relay.SPOOL_SIZE
+
+        relay._release(small)
+        relay._release(large)
+        assert relay.memory_bytes == 0
+
+    def test_fetch_all_links_oversized_and_duplicates(self):
+        """Test that oversized and already relayed files are replaced by links"""
+        relay = AttachmentRelay()
+
+        async def download(attachment):
+            item = RelayedAttachment(attachment.filename)
+            item.file = io.BytesIO(b"x" * attachment.size)
+            item.size = attachment.size
+            item.digest = attachment.filename.split(".")[0]
+            return item
+
+        relay._download = download
+        relay.relayed["dup"] = "https://discord.com/channels/1/2/3"
+        attachments = [
+            make_attachment("new.png", 10),
+            make_attachment("huge.png", 1000),
+            make_attachment("dup.png", 10),
+        ]
+        relayed = asyncio.run(relay.fetch_all(attachments, size_limit=100))
+        assert len(relay.uploads(relayed)) == 1
+        assert relay.links(relayed) == [
+            "📎 huge.png: https://cdn.example.com/huge.png",
+            "📎 dup.png: https://discord.com/channels/1/2/3",
+        ]
+
+        relay.finish(relayed, SimpleNamespace(jump_url="https://discord.com/channels/1/2/4"))
+        assert relay.relayed["new"] == "https://discord.com/channels/1/2/4"
+        assert relay.stats()["uploaded"] == 1
+        assert relay.stats()["oversized"] == 1
+        assert relay.stats()["deduplicated"] == 1
+
+    def test_to_file_from_spooled_file(self):
+        """Test that uploads are built from spooled files, in memory or rolled over to disk"""
+        for size in (10, AttachmentRelay.SPOOL_SIZE + 1):
+            item = RelayedAttachment("file.png")
+            item.file = tempfile.SpooledTemporaryFile(max_size=AttachmentRelay.SPOOL_SIZE)
+            item.file.write(b"x" * size)
+            item.size = size
+            upload = item.to_file()
+            assert not isinstance(upload.fp, tempfile.SpooledTemporaryFile)
+            assert isinstance(upload.fp, io.IOBase)
+            assert upload.fp.read() == b"x" * size
+            assert upload.filename == "file.png"
+            AttachmentRelay()._release(item)
@@ -0,0 +1,46 @@
+# tests/test_cache.py
+from bot.utils.cache import KeyedCache
+
+
+class TestKeyedCache:
+    def test_hits_and_misses(self):
+        """Test that lookups are counted as hits or misses"""
+        cache = KeyedCache()
+        assert cache.get(1) is None
+        cache.put(1, "guild")
+        assert cache.get(1) == "guild"
+        assert cache.get(1) == "guild"
+        assert cache.stats() == {"size": 1, "hits": 2, "misses": 1}
+
+    def test_invalidate(self):
+        """Test that invalidated entries are looked up again"""
+        cache = KeyedCache()
+        cache.put(1, "guild")
+        cache.invalidate(1)
+        cache.invalidate(2)  # missing keys are ignored
+        assert 1 not in cache
+        assert cache.get(1, "default") == "default"
+
+    def test_maxsize_evicts_least_recently_used(self):
+        """Test that a bounded cache evicts the least recently used entry"""
+        cache = KeyedCache(maxsize=2)
+        cache.put(1, "a")
+        cache.put(2, "b")
+        cache.get(1)
+        cache.put(3, "c")
+        assert len(cache) == 2
+        assert 1 in cache
+        assert 2 not in cache
+        assert 3 in cache
+
+    def test_ttl_expires_entries(self):
+        """Test that entries are looked up again once their ttl has passed"""
+        now = [0.0]
+        cache = KeyedCache(ttl=60, clock=lambda: now[0])
+        cache.put(1, "puzzle")
+        now[0] = 59.0
+        assert cache.get(1) == "puzzle"
+        now[0] = 60.0
+        assert cache.get(1) is None
+        assert 1 not in cache
+        assert cache.stats() == {"size": 0, "hits": 1, "misses": 1}
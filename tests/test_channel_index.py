@@ -0,0 +1,77 @@
+# tests/test_channel_index.py
+from types import SimpleNamespace
+
+import discord
+
+from bot.utils.channel_index import ChannelIndex
+
+TEXT = discord.ChannelType.text
+VOICE = discord.ChannelType.voice
+CATEGORY = discord.ChannelType.category
+
+
+def make_guild(*channels):
+    guild = SimpleNamespace(id=1, channels=[])
+    for channel_id, type, name, category_id in channels:
+        add_channel(guild, channel_id, type, name, category_id)
+    return guild
+
+
+def add_channel(guild, channel_id, type, name, category_id=None):
+    channel = SimpleNamespace(
+        id=channel_id, type=type, name=name, category_id=category_id, guild=guild
+    )
+    guild.channels.append(channel)
+    return channel
+
+
+class TestChannelIndex:
+    def test_lookups(self):
+        """Test lookups by id, by name in a category, and by name in any category"""
+        guild = make_guild(
+            (1, CATEGORY, "round-1", None),
+            (2, CATEGORY, "round-2", None),
+            (3, TEXT, "puzzle", 1),
+            (4, VOICE, "puzzle", 1),
+            (5, TEXT, "puzzle", 2),
+        )
+        index = ChannelIndex()
+        round_2 = index.get_category(guild, 2)
+        assert round_2.name == "round-2"
+        assert index.get_category(guild, 3) is None
+        assert index.get(guild, 4, VOICE).id == 4
+        assert index.get(guild, 4, TEXT) is None
+        assert index.find(guild, TEXT, "puzzle", category=round_2).id == 5
+        assert index.find(guild, TEXT, "puzzle").id == 3
+        assert index.find(guild, TEXT, "puzzle", category=None) is None
+        assert index.find_category(guild, "round-1").id == 1
+        assert index.check(guild) == []
+
+    def test_events(self):
+        """Test that renames, moves and deletions of cached channels update the index"""
+        guild = make_guild((1, CATEGORY, "round", None), (2, TEXT, "puzzle", 1))
+        index = ChannelIndex()
+        index.for_guild(guild)
+
+        channel = add_channel(guild, 3, TEXT, "other", 1)
+        assert "Channel 3 missing from the index" in index.check(guild)
+        index.add(channel)
+        assert index.find(guild, TEXT, "other").id == 3
+
+        # discord.py updates the cached channel in place
+        channel = guild.channels[1]
+        channel.name, channel.category_id = "renamed", None
+        assert index.check(guild) != []
+        index.add(channel)
+        assert index.find(guild, TEXT, "puzzle") is None
+        assert index.find(guild, TEXT, "renamed", category=None).id == 2
+        assert index.check(guild) == []
+
+        guild.channels.remove(channel)
+        index.remove(channel)
+        assert index.get(guild, 2) is None
+        assert index.find(guild, TEXT, "renamed") is None
+        assert index.check(guild) == []
+
+        index.forget_guild(guild.id)
+        assert index.check(guild) == []
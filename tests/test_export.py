@@ -0,0 +1,98 @@
+# tests/test_export.py
+import asyncio
+import datetime
+import gzip
+import io
+import json
+from types import SimpleNamespace
+
+import pytz
+
+from bot.utils import export
+from bot.utils.export import HtmlTranscript, message_record, open_compressed, puzzle_record
+
+
+def make_message(content="hello <world>"):
+    return SimpleNamespace(
+        id=42,
+        author=SimpleNamespace(id=7, name="alice", display_name="Alice"),
+        created_at=datetime.datetime(2026, 1, 16, 12, 5, tzinfo=pytz.UTC),
+        edited_at=None,
+        content=content,
+        reference=None,
+        attachments=[],
+        jump_url="https://discord.com/channels/1/2/42",
+    )
+
+
+class TestExport:
+    def test_message_record(self):
+        record = message_record(make_message())
+        assert record["id"] == 42
+        assert record["author"]["display_name"] == "Alice"
+        assert record["created_at"] == "2026-01-16T12:05:00+00:00"
+        assert record["attachments"] == []
+        json.dumps(record)  # must be serializable
+
+    def test_puzzle_record(self):
+        assert puzzle_record(None) == {}
+        puzzle = SimpleNamespace(
+            name="foo",
+            round_name="bar",
+            status="solved",
+            solution="ANSWER",
+            hunt_url="https://example.com/puzzle/foo",
+            google_sheet_id=None,
+            start_time=None,
+            solve_time=datetime.datetime(2026, 1, 16, tzinfo=pytz.UTC),
+            archive_time=None,
+        )
+        record = puzzle_record(puzzle)
+        assert record["solution"] == "ANSWER"
+        assert record["sheet_url"] is None
+        assert record["solve_time"] == "2026-01-16T00:00:00+00:00"
+
+    def test_html_transcript_escapes(self, tmp_path):
+        file = io.StringIO()
+        transcript = HtmlTranscript(file, relative_to=tmp_path / "channels")
+        transcript.write_header("foo", {"solution": "<b>", "puzzle_url": "https://example.com"})
+        record = message_record(make_message())
+        record["attachments"].append(
+            {"filename": "a.png", "url": "u", "path": str(tmp_path / "blobs" / "ab" / "abc.png")}
+        )
+        transcript.write_message(record)
+        transcript.write_footer(1)
+        text = file.getvalue()
+        assert "&lt;b&gt;" in text
+        assert "hello &lt;world&gt;" in text
+        assert "<img src='../blobs/ab/abc.png'" in text
+        assert "<a href='https://example.com'>" in text
+
+    def test_open_compressed_gzip(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(export, "zstandard", None)
+        with open_compressed(tmp_path / "foo.jsonl") as file:
+            file.write('{"a": 1}\n')
+        with gzip.open(tmp_path / "foo.jsonl.gz", "rt") as file:
+            assert file.read() == '{"a": 1}\n'
+
+    def test_export_channel_writes_in_batches(self, tmp_path, monkeypatch):
+        """Test that buffered messages are all written, across several batches"""
+        monkeypatch.setattr(export, "zstandard", None)
+        monkeypatch.setattr(export.ChannelExporter, "WRITE_BATCH_SIZE", 2)
+        messages = [make_message(f"message {i}") for i in range(5)]
+
+        async def history(limit=None, oldest_first=False):
+            for message in messages:
+                yield message
+
+        channel = SimpleNamespace(id=2, name="foo", history=history)
+        exporter = export.ChannelExporter(tmp_path, session=None)
+        assert asyncio.run(exporter.export_channel(channel)) == 5
+
+        with gzip.open(tmp_path / "channels" / "foo-2.jsonl.gz", "rt") as file:
+            lines = [json.loads(line) for line in file]
+        assert lines[0]["channel"] == {"id": 2, "name": "foo"}
+        assert [line["content"] for line in lines[1:]] == [f"message {i}" for i in range(5)]
+        text = (tmp_path / "channels" / "foo-2.html").read_text(encoding="utf-8")
+        assert "message 4" in text
+        assert "<p>5 messages</p>" in text
@@ -0,0 +1,43 @@
+# tests/test_gsheet_nexus.py
+from types import SimpleNamespace
+
+from bot.utils.gsheet_nexus import BLANK_ROW, COLUMNS, changed_row_ranges, nexus_rows
+
+
+def make_puzzle(name, **kwargs):
+    fields = {column: None for column in COLUMNS}
+    fields.update(name=name, google_sheet_id=None)
+    fields.update(kwargs)
+    return SimpleNamespace(**fields)
+
+
+class TestNexusRows:
+    def test_nexus_rows(self):
+        """Test that the header is included and discussion channels are skipped"""
+        puzzles = [
+            make_puzzle("general", puzzle_type="discussion"),
+            make_puzzle("crossword", google_sheet_id="abc123"),
+        ]
+        rows = nexus_rows(puzzles)
+        assert len(rows) == 2
+        assert rows[0][:2] == ["Name", "Round Name"]
+        assert rows[1][0] == "crossword"
+        assert rows[1][COLUMNS.index("google_sheet_url")].endswith("/abc123")
+
+
+class TestChangedRowRanges:
+    def test_no_changes(self):
+        rows = [["a"], ["b"]]
+        assert changed_row_ranges(rows, [list(row) for row in rows]) == []
+
+    def test_consecutive_changes_are_grouped(self):
+        old = [["h"], ["a"], ["b"], ["c"], ["d"]]
+        new = [["h"], ["A"], ["B"], ["c"], ["D"]]
+        assert changed_row_ranges(old, new) == [(1, 3), (4, 5)]
+
+    def test_appended_and_removed_rows(self):
+        """Test that new rows are written and removed rows are cleared"""
+        old = [["h"], ["a"]]
+        assert changed_row_ranges(old, old + [["b"]]) == [(2, 3)]
+        assert changed_row_ranges([["h"], ["a"], ["b"]], old) == [(2, 3)]
+        assert changed_row_ranges([["h"], BLANK_ROW], [["h"]]) == []
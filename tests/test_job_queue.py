@@ -0,0 +1,105 @@
+# tests/test_job_queue.py
+import asyncio
+import datetime
+
+from bot.data.job_queue import JobQueue
+from bot.database.models import JobData
+
+
+class FakeJob:
+    """Stands in for a JobData row, recording updates instead of writing them"""
+
+    def __init__(self, kind, attempts=1):
+        self.id = 1
+        self.kind = kind
+        self.attempts = attempts
+        self.payload = {}
+        self.status = JobData.RUNNING
+        self.run_time = None
+        self.last_error = None
+
+    def update(self, **kwargs):
+        job = self
+
+        class Update:
+            async def apply(self):
+                for key, value in kwargs.items():
+                    setattr(job, key, value)
+
+        return Update()
+
+
+class TestJobQueue:
+    def test_retry_delay_backs_off_exponentially(self):
+        """Test that retry delays double with each attempt, up to the maximum"""
+        assert JobQueue.retry_delay(1) == JobQueue.BASE_RETRY_DELAY
+        assert JobQueue.retry_delay(2) == JobQueue.BASE_RETRY_DELAY * 2
+        assert JobQueue.retry_delay(3) == JobQueue.BASE_RETRY_DELAY * 4
+        assert JobQueue.retry_delay(100) == JobQueue.MAX_RETRY_DELAY
+
+    def test_run_job_marks_done(self):
+        """Test that a successful job is marked as done"""
+        queue = JobQueue()
+        ran = []
+
+        async def handler(job):
+            ran.append(job.id)
+
+        queue.register("test", handler)
+        job = FakeJob("test")
+        asyncio.run(queue.run_job(job))
+        assert ran == [1]
+        assert job.status == JobData.DONE
+
+    def test_run_job_retries_then_fails(self):
+        """Test that failed jobs are retried until MAX_ATTEMPTS, then reported"""
+        queue = JobQueue()
+        failures = []
+
+        async def handler(job):
+            raise RuntimeError("drive unavailable")
+
+        async def on_failure(job, exc):
+            failures.append(str(exc))
+
+        queue.register("test", handler, on_failure=on_failure)
+
+        job = FakeJob("test", attempts=1)
+        before = datetime.datetime.now(tz=datetime.timezone.utc)
+        asyncio.run(queue.run_job(job))
+        assert job.status == JobData.PENDING
+        assert job.run_time >= before + JobQueue.BASE_RETRY_DELAY
+        assert "drive unavailable" in job.last_error
+        assert failures == []
+
+        job = FakeJob("test", attempts=JobQueue.MAX_ATTEMPTS)
+        asyncio.run(queue.run_job(job))
+        assert job.status == JobData.FAILED
+        assert failures == ["drive unavailable"]
+
+    def test_run_retries_recover(self):
+        """Test that a failed recover() is retried before the workers start"""
+        queue = JobQueue()
+        queue.POLL_INTERVAL = 0
+        attempts = []
+        worked = []
+
+        async def recover():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RuntimeError("database unavailable")
+
+        async def work():
+            worked.append(len(attempts))
+
+        queue.recover = recover
+        queue._work = work
+        asyncio.run(queue._run())
+        assert len(attempts) == 3
+        assert worked == [3] * queue.workers
+
+    def test_event_created_on_start(self):
+        """Test that the queue can be built outside of an event loop"""
+        queue = JobQueue()
+        queue.register("test", lambda job: None)
+        assert queue._wakeup is None
@@ -0,0 +1,78 @@
+# tests/test_puzzle_db.py
+import asyncio
+from types import SimpleNamespace
+
+from bot.cogs.puzzle_management import puzzle_list_embed
+from bot.data.puzzle_db import NexusRow, PuzzleDb, PuzzleDeleteRow, PuzzleListRow
+from bot.database.models import PuzzleData
+from bot.utils.gsheet_nexus import COLUMNS, nexus_rows
+
+
+def make_nexus_row(name, **kwargs):
+    fields = {field: None for field in NexusRow._fields}
+    fields.update(hunt_id=1, name=name, round_name="round", channel_mention=f"<#{name}>")
+    fields.update(kwargs)
+    return NexusRow(**fields)
+
+
+class FakeQuery:
+    """Stands in for a gino query, returning rows as plain tuples"""
+
+    def __init__(self, rows):
+        self.gino = SimpleNamespace(all=self.all)
+        self.rows = rows
+
+    async def all(self):
+        return self.rows
+
+
+class TestPuzzleRows:
+    def test_select_rows(self):
+        """Test that only the row type's columns are selected"""
+        query = PuzzleDb.select_rows(PuzzleListRow)
+        assert [column.name for column in query.columns] == list(PuzzleListRow._fields)
+
+    def test_row_fields_are_columns(self):
+        columns = set(PuzzleData.__table__.columns.keys())
+        for row_type in (PuzzleListRow, NexusRow, PuzzleDeleteRow):
+            assert set(row_type._fields) <= columns
+            assert len(row_type._fields) < len(columns)
+
+    def test_load_rows(self):
+        """Test that the selected tuples are loaded as row_type"""
+        query = FakeQuery([("round", "<#1>", None, "ANSWER", "solved")])
+        rows = asyncio.run(PuzzleDb.load_rows(PuzzleListRow, query))
+        assert rows == [PuzzleListRow("round", "<#1>", None, "ANSWER", "solved")]
+        assert rows[0].solution == "ANSWER"
+
+    def test_nexus_rows(self):
+        """Test that rows without a sheet, or without the nexus-only columns, are written"""
+        puzzles = [
+            make_nexus_row("crossword", google_sheet_id="abc123", status="solved"),
+            make_nexus_row("sudoku", google_sheet_id=None),
+        ]
+        rows = nexus_rows(puzzles)
+        assert len(rows) == 3
+        sheet_url = COLUMNS.index("google_sheet_url")
+        assert rows[1][0] == "crossword"
+        assert rows[1][sheet_url].endswith("/abc123")
+        assert rows[1][COLUMNS.index("status")] == "solved"
+        assert rows[2][0] == "sudoku"
+        assert rows[2][sheet_url] == ""
+        assert rows[2][COLUMNS.index("notes")] == ""
+
+    def test_puzzle_list_embed(self):
+        """Test that puzzles are listed with a field per round"""
+        puzzles = [
+            PuzzleListRow("round 1", "<#1>", "meta", "ANSWER", "solved"),
+            PuzzleListRow("round 1", "<#2>", None, None, "in progress"),
+            PuzzleListRow("round 2", "<#3>", None, None, None),
+        ]
+        embed = puzzle_list_embed(puzzles)
+        assert [field.name for field in embed.fields] == ["round 1", "round 2"]
+        assert embed.fields[0].value == "<#1> type:meta sol:**ANSWER**\n<#2> status:in progress\n"
+        assert embed.fields[1].value == "<#3>\n"
+
+    def test_puzzle_list_embed_empty(self):
+        embed = puzzle_list_embed([])
+        assert [field.value for field in embed.fields] == ["No puzzles to list"]
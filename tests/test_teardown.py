@@ -0,0 +1,89 @@
+# tests/test_teardown.py
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from bot.utils.teardown import TeardownProgress, delete_channels
+
+
+class FakeChannel:
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+        self.deleted = False
+
+    async def delete(self, reason=None):
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        self.deleted = True
+
+
+def http_error(cls, status):
+    return cls(SimpleNamespace(status=status, reason=""), "error")
+
+
+class TestTeardown:
+    def test_delete_channels(self):
+        """Test that missing and failed channels are counted, and failures returned"""
+        channels = [
+            FakeChannel("a"),
+            None,
+            FakeChannel("b", error=http_error(discord.NotFound, 404)),
+            FakeChannel("c", error=http_error(discord.HTTPException, 500)),
+            FakeChannel("d"),
+        ]
+        progress = TeardownProgress(len(channels))
+        reports = []
+
+        async def on_progress(progress):
+            reports.append(progress.done)
+
+        failed = asyncio.run(
+            delete_channels(channels, progress, 2, on_progress=on_progress, clock=lambda: 100.0)
+        )
+        assert [channel.name for channel in failed] == ["c"]
+        assert channels[0].deleted and channels[4].deleted
+        assert (progress.deleted, progress.missing, progress.failed) == (2, 2, 1)
+        assert progress.done == 5
+        assert progress.text() == "Deleted 2/5 channels, 2 already gone, 1 failed"
+        # Reports are throttled to one per REPORT_INTERVAL
+        assert len(reports) == 1
+
+    def test_report_interval(self):
+        """Test that progress is reported again once REPORT_INTERVAL has passed"""
+        now = [0.0]
+
+        def clock():
+            now[0] += TeardownProgress.REPORT_INTERVAL / 2
+            return now[0]
+
+        channels = [FakeChannel(str(i)) for i in range(6)]
+        progress = TeardownProgress(len(channels))
+        reports = []
+
+        async def on_progress(progress):
+            reports.append(progress.done)
+
+        asyncio.run(delete_channels(channels, progress, 1, on_progress=on_progress, clock=clock))
+        assert len(reports) == 3
+
+    def test_concurrency(self):
+        """Test that at most the given number of channels are deleted at once"""
+        active = 0
+        peak = 0
+
+        class SlowChannel(FakeChannel):
+            async def delete(self, reason=None):
+                nonlocal active, peak
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        channels = [SlowChannel(str(i)) for i in range(10)]
+        progress = TeardownProgress(len(channels))
+        asyncio.run(delete_channels(channels, progress, 3))
+        assert peak == 3
+        assert progress.deleted == 10